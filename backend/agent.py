@@ -166,6 +166,36 @@ Critical rules:
         self._editor_language: str = "python"
         # Set by the frontend when operating inside a Learn Book workspace
         self._learn_book_id: str = ""
+        # Background warm-up of the current learn book's RAG path (asyncio.Task)
+        self._warmup_task = None
+
+    # ── Learn book context ────────────────────────────────────────────────────
+    def set_learn_book(self, book_id: str) -> None:
+        """Switch to a learn book and warm up its retrieval path in the background."""
+        if book_id == self._learn_book_id:
+            return  # same book, e.g. only the editor code changed
+        self._learn_book_id = book_id
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+            logger.info("Learn book warm-up cancelled | context changed")
+        self._warmup_task = asyncio.create_task(self._warm_up_learn_book(book_id)) if book_id else None
+
+    async def _warm_up_learn_book(self, book_id: str) -> None:
+        """
+        Load the embedding model, touch the book's vectors and import the
+        learn-code modules, so the first generate_learn_code is not cold.
+        """
+        try:
+            from backend.services.rag_service import awarm_up
+
+            await awarm_up(
+                f"learn-book-{book_id}",
+                modules=("backend.services.llm_service", "backend.services.learn_codegen_service"),
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Learn book warm-up failed | book_id=%s | %s", book_id, exc)
 
     # ── Tool: generate new code ───────────────────────────────────────────────
     @function_tool(description=(
@@ -287,13 +317,16 @@ Critical rules:
         if self._editor_language != "python":
             return "TOOL_DONE: Run is only available for Python code."
         try:
-            from backend.services.execution_service import run_python
+            from backend.services.execution_service import run_python, stdin_exhausted
 
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(None, partial(run_python, self._editor_code))
 
             if result.timed_out:
                 return "TOOL_DONE: Execution timed out."
+            if stdin_exhausted(result):
+                # Not a bug: the runner has no way to type input for the program.
+                return "TOOL_DONE: The program waits for keyboard input, which this runner cannot provide."
             if result.exit_code != 0:
                 err = (result.stderr or "Unknown runtime error").strip()
                 return f"TOOL_DONE: Run failed. {err[:300]}"
@@ -316,7 +349,7 @@ Critical rules:
             import os
             from backend.services.llm_service import LLMConfig, build_llm
             from backend.services.learn_codegen_service import generate_educational_code
-            from backend.services.rag_service import search_context
+            from backend.services.rag_service import asearch_context
 
             model_name = os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile")
             llm = build_llm(LLMConfig(model=model_name, temperature=0.3, max_tokens=None))
@@ -327,10 +360,7 @@ Critical rules:
             if self._learn_book_id:
                 try:
                     collection_name = f"learn-book-{self._learn_book_id}"
-                    loop = asyncio.get_event_loop()
-                    rag_context, rag_sources = await loop.run_in_executor(
-                        None, lambda: search_context(prompt, collection_name, k=3)
-                    )
+                    rag_context, rag_sources = await asearch_context(prompt, collection_name, k=3)
                     if rag_context:
                         logger.info(
                             "RAG context found | collection=%s | chars=%d | sources=%s",
@@ -417,7 +447,7 @@ async def my_agent(ctx: agents.JobContext):
                 )
             elif data_packet.topic == "learn_book_context":
                 payload = json.loads(bytes(data_packet.data).decode("utf-8"))
-                assistant._learn_book_id = payload.get("book_id", "")
+                assistant.set_learn_book(payload.get("book_id", ""))
                 assistant._editor_code = payload.get("code", "")
                 assistant._editor_language = payload.get("language", "python")
                 logger.info(
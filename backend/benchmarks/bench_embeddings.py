@@ -0,0 +1,78 @@
+"""
+bench_embeddings.py — embedding throughput and query latency per backend.
+
+Embeds the chunks of a synthetic PDF with each backend and batch size
+(uncached), timing every request, then times single-query embeddings right
+after that run; each row's numbers come from its own configuration.  Ollama
+must be running for ``ollama``; ``onnx`` needs EMBED_ONNX_MODEL_DIR and the
+onnxruntime + tokenizers packages.
+
+Usage (from the workspace root):
+    python -m backend.benchmarks.bench_embeddings --backends ollama onnx --pages 40 --batch 32 64
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+
+from backend.benchmarks.synthetic_pdf import make_pdf
+from backend.env_loader import load_backend_env
+from backend.services.embedding_service import create_embeddings
+from backend.services.rag_service import _iter_chunks, _iter_pages
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backends", nargs="+", default=["ollama", "onnx"], choices=["ollama", "onnx"])
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--batch", type=int, nargs="+", default=[32, 64])
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    load_backend_env()
+    texts = [chunk.page_content for chunk in _iter_chunks(_iter_pages(make_pdf(args.pages), "bench.pdf"))]
+    questions = [f"How does a {topic} work in Python?" for topic in ("loop", "list", "dict", "class", "generator")]
+    print(f"{len(texts)} chunks from {args.pages} pages\n")
+    print(
+        f"{'backend':>8} {'batch':>6} {'chunks/s':>10} {'batch p50 ms':>13} "
+        f"{'query p50 ms':>13} {'query p95 ms':>13}"
+    )
+
+    for backend in args.backends:
+        os.environ["EMBED_BACKEND"] = backend
+        try:
+            embeddings = create_embeddings()
+            embeddings.embed_query("warm-up")
+        except Exception as exc:
+            print(f"{backend:>8} skipped: {exc}")
+            continue
+
+        for batch in args.batch:
+            batch_latencies = []
+            started = time.perf_counter()
+            for start in range(0, len(texts), batch):
+                request_started = time.perf_counter()
+                embeddings.embed_documents(texts[start:start + batch])
+                batch_latencies.append((time.perf_counter() - request_started) * 1000)
+            elapsed = time.perf_counter() - started
+
+            latencies = []
+            for i in range(args.queries):
+                started = time.perf_counter()
+                embeddings.embed_query(f"{questions[i % len(questions)]} ({batch}/{i})")
+                latencies.append((time.perf_counter() - started) * 1000)
+            print(
+                f"{backend:>8} {batch:>6} {len(texts) / elapsed:>10.1f} "
+                f"{statistics.median(batch_latencies):>13.2f} {statistics.median(latencies):>13.2f} {_percentile(latencies, 0.95):>13.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
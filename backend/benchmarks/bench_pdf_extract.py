@@ -0,0 +1,42 @@
+"""
+bench_pdf_extract.py — PDF text-extraction throughput vs. worker count.
+
+Usage (from the workspace root):
+    python -m backend.benchmarks.bench_pdf_extract --pages 400 --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from backend.benchmarks.synthetic_pdf import make_pdf
+from backend.services.pdf_service import extract_pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 500])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    for pages in args.pages:
+        pdf = make_pdf(pages)
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            # Warm the pool so process start-up is not billed to the first run.
+            sum(1 for _ in extract_pages(pdf, workers=workers))
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                extracted = sum(1 for _ in extract_pages(pdf, workers=workers))
+                best = min(best, time.perf_counter() - started)
+            assert extracted == pages
+            baseline = baseline or best
+            print(f"{pages:>6} {workers:>8} {best:>9.3f} {pages / best:>9.1f} {baseline / best:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+bench_rag.py — end-to-end index_pdf / search_context benchmark with local stand-ins.
+
+Runs the real ingest and retrieval code paths (extraction, boilerplate and
+near-duplicate filtering, hash diffing, the embedding pipeline, compression)
+without Ollama or a Qdrant server:
+
+  embeddings  FakeEmbeddings: deterministic hashed bag-of-words vectors, with
+              an optional simulated per-request latency
+  vectors     qdrant-client's in-process Qdrant (``:memory:``, or on disk with
+              --qdrant-path), or the LocalVectorStore (--backend local)
+
+For each synthetic PDF size it reports ingest pages/s and chunks/s, a no-op
+re-index, peak RSS (process high-water mark, so sizes run smallest first) and
+search_context latency percentiles for unique (uncached) and repeated (cached)
+questions.  ``--json`` writes the same numbers for regression tracking.
+
+Usage (from the workspace root):
+    python -m backend.benchmarks.bench_rag --pages 20 100 400 --queries 200 --json bench_rag.json
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.benchmarks.synthetic_pdf import _WORDS, make_pdf
+from backend.env_loader import load_backend_env
+from backend.services import rag_service
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words: texts sharing words get similar vectors, runs are reproducible."""
+
+    def __init__(self, dim: int = 384, latency_ms: float = 0.0) -> None:
+        self._dim = dim
+        self._latency_s = latency_ms / 1000
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self._dim, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self._dim] += 1.0 if h >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self._latency_s:
+            time.sleep(self._latency_s)
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self._latency_s:
+            time.sleep(self._latency_s)
+        return self._vector(text).tolist()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q * 100)) if samples else 0.0
+
+
+def _questions(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"How does {' '.join(rng.sample(_WORDS, 3))} work? ({i})"
+        for i in range(count)
+    ]
+
+
+def _install_stand_ins(embeddings: Embeddings, qdrant_path: Optional[str]) -> None:
+    """Point rag_service's process-wide clients at the stand-ins."""
+    from qdrant_client import QdrantClient
+
+    rag_service._client = QdrantClient(path=qdrant_path) if qdrant_path else QdrantClient(":memory:")
+    rag_service._embeddings = embeddings
+    rag_service._ensured.clear()
+    rag_service._dimensions.clear()
+
+
+def _time_queries(questions: List[str], collection_name: str, k: int) -> List[float]:
+    latencies = []
+    for question in questions:
+        started = time.perf_counter()
+        rag_service.search_context(question, collection_name, k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run(pages: int, args: argparse.Namespace) -> dict:
+    collection_name = f"{rag_service.BOOK_COLLECTION_PREFIX}bench-{pages}-{uuid.uuid4().hex[:8]}"
+    pdf = make_pdf(pages, seed=pages)
+    try:
+        started = time.perf_counter()
+        stats = rag_service.index_pdf(pdf, collection_name, "bench.pdf")
+        ingest_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        rag_service.index_pdf(pdf, collection_name, "bench.pdf")
+        reindex_s = time.perf_counter() - started
+
+        unique = _questions(args.queries, seed=pages)
+        rag_service.search_context("warm-up question", collection_name, k=args.k)
+        cold = _time_queries(unique, collection_name, args.k)
+        cached = _time_queries(unique[: max(1, args.queries // 4)], collection_name, args.k)
+    finally:
+        rag_service.delete_collection(collection_name)
+
+    return {
+        "pages": pages,
+        "chunks": stats.chunks_upserted,
+        "ingest_s": round(ingest_s, 4),
+        "pages_per_s": round(stats.pages_parsed / ingest_s, 2),
+        "chunks_per_s": round(stats.chunks_upserted / ingest_s, 2),
+        "reindex_s": round(reindex_s, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "query_p50_ms": round(_percentile(cold, 0.50), 3),
+        "query_p95_ms": round(_percentile(cold, 0.95), 3),
+        "query_p99_ms": round(_percentile(cold, 0.99), 3),
+        "cached_query_p50_ms": round(_percentile(cached, 0.50), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0,
+                        help="simulated latency of every embedding request")
+    parser.add_argument("--backend", choices=["qdrant", "local"], default="qdrant")
+    parser.add_argument("--storage-mode", choices=["per_book", "shared"], default="per_book")
+    parser.add_argument("--qdrant-path", help="on-disk local Qdrant directory instead of :memory:")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    args = parser.parse_args()
+
+    load_backend_env()
+    os.environ["RAG_VECTOR_BACKEND"] = args.backend
+    os.environ["QDRANT_STORAGE_MODE"] = args.storage_mode
+    os.environ["RAG_LOCAL_STORE_DIR"] = tempfile.mkdtemp(prefix="bench-rag-")
+    _install_stand_ins(FakeEmbeddings(args.dim, args.embed_latency_ms), args.qdrant_path)
+
+    results = []
+    print(
+        f"{'pages':>6} {'chunks':>7} {'pages/s':>9} {'chunks/s':>9} {'reindex s':>10} {'RSS MB':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cached p50':>11}",
+        file=sys.stderr if args.json == "-" else sys.stdout,
+    )
+    for pages in sorted(args.pages):
+        row = run(pages, args)
+        results.append(row)
+        print(
+            f"{row['pages']:>6} {row['chunks']:>7} {row['pages_per_s']:>9.1f} {row['chunks_per_s']:>9.1f} "
+            f"{row['reindex_s']:>10.3f} {row['peak_rss_mb']:>8.1f} {row['query_p50_ms']:>8.2f} "
+            f"{row['query_p95_ms']:>8.2f} {row['query_p99_ms']:>8.2f} {row['cached_query_p50_ms']:>11.3f}",
+            file=sys.stderr if args.json == "-" else sys.stdout,
+        )
+
+    if args.json:
+        report = {
+            "benchmark": "bench_rag",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "backend": args.backend,
+                "storage_mode": args.storage_mode,
+                "qdrant": "path" if args.qdrant_path else "memory",
+                "dim": args.dim,
+                "k": args.k,
+                "queries": args.queries,
+                "embed_latency_ms": args.embed_latency_ms,
+            },
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, "w", encoding="utf-8") as handle:
+                json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+bench_vector_storage.py — memory footprint and recall@k of quantized / on-disk collections.
+
+Builds one collection per storage layout on the configured Qdrant server
+(QDRANT_URL / QDRANT_HOST), loads the same synthetic clustered corpus into each,
+and reports resident memory plus recall@k against both exact search and the
+float32 in-RAM baseline.  Collections are dropped afterwards.
+
+Memory is reported twice:
+  RAM MB       measured: growth of the server's ``memory_resident_bytes``
+               (Qdrant /metrics) while the collection is loaded and queried.
+               Server-wide, so run against an otherwise idle Qdrant; "n/a" if
+               the server does not expose the metric.
+  est. RAM MB  estimate from vector, HNSW link and payload sizes only.
+
+Usage (from the workspace root, against a running Qdrant):
+    python -m backend.benchmarks.bench_vector_storage --vectors 20000 --dim 768 --k 3 10
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from typing import Optional
+
+import httpx
+import numpy as np
+
+from backend.env_loader import load_backend_env
+from backend.services.rag_service import _env, _make_client, _qdrant_url, vector_storage_config
+
+# (label, quantization, on-disk original vectors, on-disk payload)
+LAYOUTS = [
+    ("float32", "none", False, False),
+    ("int8", "int8", False, False),
+    ("int8+disk", "int8", True, True),
+]
+
+_HNSW_M = 16  # Qdrant default; each vector keeps ~2*m links of 4 bytes on layer 0
+
+
+def synthetic_corpus(count: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors grouped around random centroids, like topical text chunks."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim))
+    vectors = centroids[rng.integers(0, clusters, count)] + 0.6 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def estimated_ram_bytes(count: int, dim: int, quantization: str, on_disk: bool, payload_bytes: int, on_disk_payload: bool) -> int:
+    ram = count * _HNSW_M * 2 * 4
+    if quantization == "int8":
+        ram += count * dim  # quantized copy is always in RAM
+    if not on_disk:
+        ram += count * dim * 4
+    if not on_disk_payload:
+        ram += count * payload_bytes
+    return ram
+
+
+def resident_bytes() -> Optional[int]:
+    """Qdrant's ``memory_resident_bytes`` gauge from /metrics, or None if unavailable."""
+    api_key = _env("QDRANT_API_KEY", "")
+    try:
+        response = httpx.get(
+            f"{_qdrant_url().rstrip('/')}/metrics",
+            headers={"api-key": api_key} if api_key else None,
+            timeout=10.0,
+        )
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith("memory_resident_bytes "):
+            return int(float(line.split()[1]))
+    return None
+
+
+def _wait_indexed(client, name: str, timeout_s: float = 600.0) -> None:
+    from qdrant_client.http.models import CollectionStatus
+
+    deadline = time.monotonic() + timeout_s
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{name} did not finish indexing")
+        time.sleep(0.5)
+
+
+def _recall(found: list[list[int]], expected: list[list[int]], k: int) -> float:
+    hits = sum(len(set(f[:k]) & set(e[:k])) for f, e in zip(found, expected))
+    return hits / (k * len(expected))
+
+
+def main() -> None:
+    from qdrant_client.http.models import QuantizationSearchParams, SearchParams
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    args = parser.parse_args()
+
+    load_backend_env()
+    client = _make_client()
+    max_k = max(args.k)
+
+    corpus = synthetic_corpus(args.vectors, args.dim, args.clusters)
+    queries = synthetic_corpus(args.queries, args.dim, args.clusters, seed=1)
+    exact = np.argsort(-(queries @ corpus.T), axis=1)[:, :max_k].tolist()
+    payload = {"page_content": "x" * 800, "metadata": {"source": "bench.pdf", "page": 0}}
+    payload_bytes = 900
+
+    results: dict[str, list[list[int]]] = {}
+    print(f"{'layout':>10} {'RAM MB':>8} {'est. RAM MB':>12} {'p50 ms':>8} " + " ".join(
+        f"{'R@' + str(k) + ' exact':>11} {'R@' + str(k) + ' f32':>9}" for k in args.k
+    ))
+    for label, quantization, on_disk, on_disk_payload in LAYOUTS:
+        name = f"bench-storage-{label.replace('+', '-')}-{uuid.uuid4().hex[:8]}"
+        before = resident_bytes()
+        client.create_collection(
+            collection_name=name,
+            **vector_storage_config(args.dim, quantization, on_disk, on_disk_payload),
+        )
+        try:
+            client.upload_collection(
+                collection_name=name,
+                vectors=corpus,
+                payload=(payload for _ in range(args.vectors)),
+                ids=range(args.vectors),
+                batch_size=256,
+            )
+            _wait_indexed(client, name)
+
+            params = None
+            if quantization != "none":
+                params = SearchParams(
+                    quantization=QuantizationSearchParams(rescore=True, oversampling=args.oversampling)
+                )
+            found, latencies = [], []
+            for query in queries:
+                started = time.perf_counter()
+                points = client.query_points(
+                    collection_name=name, query=query.tolist(), limit=max_k, search_params=params
+                ).points
+                latencies.append((time.perf_counter() - started) * 1000)
+                found.append([int(p.id) for p in points])
+            results[label] = found
+            after = resident_bytes()
+        finally:
+            client.delete_collection(name)
+
+        measured = f"{(after - before) / 2**20:.1f}" if before is not None and after is not None else "n/a"
+        ram = estimated_ram_bytes(args.vectors, args.dim, quantization, on_disk, payload_bytes, on_disk_payload)
+        columns = " ".join(
+            f"{_recall(found, exact, k):>11.3f} {_recall(found, results['float32'], k):>9.3f}" for k in args.k
+        )
+        print(f"{label:>10} {measured:>8} {ram / 2**20:>12.1f} {np.median(latencies):>8.2f} {columns}")
+
+
+if __name__ == "__main__":
+    main()
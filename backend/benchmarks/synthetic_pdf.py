@@ -0,0 +1,65 @@
+"""
+synthetic_pdf.py — dependency-free generator of multi-page text PDFs.
+
+Used by the benchmarks to produce realistic extraction/ingestion workloads
+without shipping fixture files.  Every page carries a repeated header and
+footer plus paragraphs of pseudo-random prose, similar to a textbook.
+"""
+from __future__ import annotations
+
+import random
+from typing import List
+
+_WORDS = (
+    "variable function loop list dictionary string integer recursion class object "
+    "method module import return value argument parameter condition branch iterate "
+    "index slice tuple set exception error debug test algorithm complexity sort "
+    "search tree graph node edge queue stack memory pointer reference scope"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(page: int, lines_per_page: int, rng: random.Random) -> List[str]:
+    lines = [f"Introduction to Programming - Chapter {page // 20 + 1}"]
+    for _ in range(lines_per_page):
+        lines.append(" ".join(rng.choice(_WORDS) for _ in range(12)).capitalize() + ".")
+    lines.append(f"Page {page + 1}")
+    return lines
+
+
+def make_pdf(pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    """Return the bytes of a `pages`-page PDF using the built-in Helvetica font."""
+    rng = random.Random(seed)
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids [%s] /Count %d >>"
+            % (" ".join(f"{4 + 2 * i} 0 R" for i in range(pages)), pages)
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(pages):
+        objects.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+            ).encode()
+        )
+        shown = " ".join(f"({_escape(line)}) '" for line in _page_lines(i, lines_per_page, rng))
+        stream = f"BT /F1 10 Tf 40 770 Td 15 TL {shown} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
@@ -0,0 +1,55 @@
+-- Learn Book Documents: the PDFs attached to a learn book (textbook, handouts, ...)
+-- Every document is indexed into the book's collection with a document_id payload,
+-- so retrieval spans the whole book and a document can be removed on its own.
+-- learn_books.has_pdf / pdf_collection_name stay as the book-level "has indexed
+-- content" flag and collection pointer.
+CREATE TABLE IF NOT EXISTS learn_book_documents (
+  id           uuid        PRIMARY KEY DEFAULT gen_random_uuid(),
+  book_id      uuid        NOT NULL REFERENCES learn_books(id) ON DELETE CASCADE,
+  user_id      uuid        NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  filename     text        NOT NULL,
+  status       text        NOT NULL DEFAULT 'queued'
+                           CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+  job_id       text,
+  pages        integer     NOT NULL DEFAULT 0,
+  chunks       integer     NOT NULL DEFAULT 0,
+  error        text,
+  created_at   timestamptz NOT NULL DEFAULT now(),
+  updated_at   timestamptz NOT NULL DEFAULT now()
+);
+
+-- Index for fast per-book lookups
+CREATE INDEX IF NOT EXISTS learn_book_documents_book_id_idx ON learn_book_documents(book_id);
+
+-- Row Level Security
+ALTER TABLE learn_book_documents ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own book documents"
+  ON learn_book_documents FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can add documents to their books"
+  ON learn_book_documents FOR INSERT
+  WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update their own book documents"
+  ON learn_book_documents FOR UPDATE
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can delete their own book documents"
+  ON learn_book_documents FOR DELETE
+  USING (auth.uid() = user_id);
+
+-- Auto-update updated_at on every row change
+CREATE OR REPLACE FUNCTION update_learn_book_documents_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER learn_book_documents_updated_at_trigger
+  BEFORE UPDATE ON learn_book_documents
+  FOR EACH ROW
+  EXECUTE FUNCTION update_learn_book_documents_updated_at();
@@ -15,7 +15,7 @@ from backend.models.schemas import (
     SummaryResponse,
 )
 from backend.services.codegen_service import detect_language, generate_code
-from backend.services.debug_service import debug_code
+from backend.services.debug_service import debug_with_runtime_check
 from backend.services.intent_service import classify_intent
 from backend.services.planning_service import build_plan
 from backend.services.summary_service import summarize_code
@@ -76,7 +76,7 @@ def _debug_node(state: WorkflowState) -> WorkflowState:
         lang = LanguageType(lang_str)
     except ValueError:
         lang = LanguageType.PYTHON
-    result = debug_code(
+    result = debug_with_runtime_check(
         code=state.get("existing_code", ""),
         language=lang,
         error_message=state.get("error_message", ""),
@@ -171,12 +171,16 @@ def run_debug_only(
     error_message: str,
     model: str,
 ) -> DebugResponse:
-    """Debug existing code without running the full intent pipeline."""
+    """Debug existing code without running the full intent pipeline.
+
+    Python code is run in the sandbox first, so clean code skips the LLM and
+    failing code is debugged against its real traceback.
+    """
     try:
         lang = LanguageType(existing_language)
     except ValueError:
         lang = LanguageType.PYTHON
-    return debug_code(
+    return debug_with_runtime_check(
         code=existing_code,
         language=lang,
         error_message=error_message,
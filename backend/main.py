@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import logging
 import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -9,11 +12,29 @@ from backend.routers.ai import router as ai_router
 from backend.routers.projects import router as projects_router
 from backend.routers.learn_books import router as learn_books_router
 from backend.routers.roadmap import router as roadmap_router
+from backend.services.collection_gc import start_reconciler
+from backend.services.ingest_jobs import get_ingest_queue
 
 
 load_backend_env()
 
-app = FastAPI(title="VoiceForge API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Resume PDF ingestion jobs that were interrupted by the last shutdown.
+    recovered = get_ingest_queue().recover()
+    if recovered:
+        logger.info("Recovered %d interrupted ingest job(s)", recovered)
+    # Reclaim vectors of books deleted without their collection (see collection_gc).
+    gc_task = start_reconciler()
+    yield
+    if gc_task is not None:
+        gc_task.cancel()
+
+
+app = FastAPI(title="VoiceForge API", lifespan=lifespan)
 
 allowed_origins = [
     origin.strip()
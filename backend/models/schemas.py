@@ -83,6 +83,17 @@ class AIProcessResponse(BaseModel):
 
 class RunRequest(BaseModel):
     code: str = Field(..., min_length=1)
+    project_id: Optional[str] = None
+    # Opt-in: keep a per-project interpreter alive and only re-run changed cells
+    session: bool = False
+
+
+class RunSessionResetRequest(BaseModel):
+    project_id: str = Field(..., min_length=1)
+
+
+class RunSessionResetResponse(BaseModel):
+    reset: bool
 
 
 class RunResult(BaseModel):
@@ -92,6 +103,27 @@ class RunResult(BaseModel):
     timed_out: bool
 
 
+class RunCase(BaseModel):
+    stdin: str = Field(default="")
+
+
+class BatchRunRequest(BaseModel):
+    code: str = Field(..., min_length=1)
+    cases: List[RunCase] = Field(..., min_length=1, max_length=100)
+    timeout_seconds: int = Field(default=5, ge=1, le=30)
+
+
+class BatchCaseResult(BaseModel):
+    index: int
+    result: RunResult
+    duration_ms: float
+
+
+class BatchRunResponse(BaseModel):
+    results: List[BatchCaseResult]
+    total_ms: float
+
+
 class ProjectCreate(BaseModel):
     name: str = Field(..., min_length=1)
     language: LanguageType
@@ -145,9 +177,39 @@ class LearnBookRecord(BaseModel):
     updated_at: Optional[str] = None
 
 
-class PdfUploadResponse(BaseModel):
+class IngestJobStatus(BaseModel):
+    job_id: str
+    book_id: str
     collection_name: str
-    chunks_indexed: int
+    document_id: Optional[str] = None
+    status: Literal["queued", "running", "completed", "failed"]
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_failed: int = 0
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
+    chunks_near_duplicate: int = 0
+    boilerplate_lines_removed: int = 0
+    error: Optional[str] = None
+
+
+class LearnBookDocumentRecord(BaseModel):
+    id: str
+    book_id: str
+    filename: str
+    status: Literal["queued", "running", "completed", "failed"]
+    job_id: Optional[str] = None
+    pages: int = 0
+    chunks: int = 0
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class LearnAskRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    k: int = Field(default=3, ge=1, le=10)
 
 
 # Educational response — much richer than standard CodeResponse
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import time
 
 from fastapi import APIRouter, Depends
 
 from backend.graph.workflow import run_generate_only, run_plan_only, run_workflow
-from backend.models.schemas import AIProcessRequest, AIProcessResponse, RunRequest, RunResult
-from backend.services.execution_service import run_python
+from backend.models.schemas import (
+    AIProcessRequest,
+    AIProcessResponse,
+    BatchRunRequest,
+    BatchRunResponse,
+    RunRequest,
+    RunResult,
+    RunSessionResetRequest,
+    RunSessionResetResponse,
+)
+from backend.services.execution_service import run_python, run_python_batch
 from backend.services.auth_service import get_current_user_id
+from backend.services.session_service import get_session_manager
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
@@ -34,6 +46,29 @@ async def process_request(payload: AIProcessRequest, user_id: str = Depends(get_
 
 @router.post("/run", response_model=RunResult)
 async def run_code(payload: RunRequest, user_id: str = Depends(get_current_user_id)):
-    _ = user_id
+    if payload.session and payload.project_id:
+        # Stateful run: only the changed top-level cells execute in the project's session.
+        return await asyncio.to_thread(
+            get_session_manager().run, user_id, payload.project_id, payload.code
+        )
     result = run_python(payload.code)
     return result
+
+
+@router.post("/run/batch", response_model=BatchRunResponse)
+async def run_code_batch(payload: BatchRunRequest, user_id: str = Depends(get_current_user_id)):
+    _ = user_id
+    started = time.perf_counter()
+    results = await asyncio.to_thread(
+        run_python_batch, payload.code, payload.cases, payload.timeout_seconds
+    )
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+    return BatchRunResponse(results=results, total_ms=total_ms)
+
+
+@router.post("/run/reset", response_model=RunSessionResetResponse)
+async def reset_run_session(
+    payload: RunSessionResetRequest, user_id: str = Depends(get_current_user_id)
+):
+    reset = get_session_manager().reset(user_id, payload.project_id)
+    return RunSessionResetResponse(reset=reset)
@@ -1,27 +1,33 @@
 """
-learn_books.py — REST router for Learn Books (CRUD + PDF upload + AI generation).
+learn_books.py — REST router for Learn Books (CRUD + background PDF ingestion + AI generation).
 
 All routes are protected by Supabase JWT authentication.
 """
 from __future__ import annotations
 
-import io
+import asyncio
+import json
 import logging
 import os
-from typing import List, Optional
+from dataclasses import asdict
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
 
 from backend.db.supabase_client import get_supabase_client
 from backend.models.schemas import (
+    IngestJobStatus,
     LearnAIProcessResponse,
+    LearnAskRequest,
     LearnBookCreate,
+    LearnBookDocumentRecord,
     LearnBookRecord,
     LearnBookUpdate,
-    PdfUploadResponse,
     PlanStage,
 )
 from backend.services.auth_service import get_current_user_id
+from backend.services.ingest_jobs import get_ingest_queue
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +44,13 @@ def _handle_db_error(error: Exception) -> None:
     )
 
 
+def _is_pdf(file: UploadFile) -> bool:
+    # Also allow octet-stream uploads from some browsers
+    if file.content_type and "pdf" in file.content_type.lower():
+        return True
+    return not file.filename or file.filename.lower().endswith(".pdf")
+
+
 def _get_model() -> str:
     return os.environ.get("GROQ_MODEL", "llama-3.1-70b-versatile")
 
@@ -138,19 +151,71 @@ async def update_book(
     return response.data[0]
 
 
+def _purge_book_vectors(book_id: str) -> None:
+    from backend.services.rag_service import purge_book
+
+    try:
+        purge_book(book_id)
+    except Exception as exc:
+        # The orphan reconciler (services/collection_gc.py) retries later.
+        logger.warning("Could not delete vectors of book %s: %s", book_id, exc)
+
+
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_book(book_id: str, user_id: str = Depends(get_current_user_id)):
+async def delete_book(
+    book_id: str,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user_id),
+):
     client = _get_supabase()
     if client is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Database not configured",
         )
-    # Fetch the book first so we can clean up the Qdrant collection
+    try:
+        deleted = (
+            client.table("learn_books").delete().eq("id", book_id).eq("user_id", user_id).execute()
+        )
+    except Exception as exc:
+        _handle_db_error(exc)
+
+    # Vectors are removed after the response is sent, so deletion never waits on Qdrant.
+    if deleted.data:
+        background_tasks.add_task(_purge_book_vectors, book_id)
+
+
+# ── PDF Upload ────────────────────────────────────────────────────────────────
+
+@router.post(
+    "/{book_id}/upload-pdf",
+    response_model=IngestJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_pdf(
+    book_id: str,
+    file: UploadFile = File(...),
+    user_id: str = Depends(get_current_user_id),
+):
+    """Accept a PDF upload and queue it for background indexing into Qdrant."""
+    if not _is_pdf(file):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are accepted.",
+        )
+
+    client = _get_supabase()
+    if client is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database not configured",
+        )
+
+    # Ensure the book belongs to this user
     try:
         resp = (
             client.table("learn_books")
-            .select("has_pdf,pdf_collection_name")
+            .select("id")
             .eq("id", book_id)
             .eq("user_id", user_id)
             .single()
@@ -158,36 +223,64 @@ async def delete_book(book_id: str, user_id: str = Depends(get_current_user_id))
         )
     except Exception as exc:
         _handle_db_error(exc)
+    if not resp.data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
 
-    if resp.data and resp.data.get("has_pdf") and resp.data.get("pdf_collection_name"):
-        try:
-            from backend.services.rag_service import delete_collection
-            delete_collection(resp.data["pdf_collection_name"])
-        except Exception as exc:
-            logger.warning("Could not delete Qdrant collection: %s", exc)
+    pdf_bytes = await file.read()
+    collection_name = f"learn-book-{book_id}"
+
+    # has_pdf is set by the ingest worker once every chunk is indexed.
+    job = get_ingest_queue().submit(
+        book_id=book_id,
+        user_id=user_id,
+        collection_name=collection_name,
+        source=file.filename or "PDF",
+        pdf_bytes=pdf_bytes,
+    )
+    return IngestJobStatus(**asdict(job))
 
+
+# ── Documents ─────────────────────────────────────────────────────────────────
+
+@router.get("/{book_id}/documents", response_model=List[LearnBookDocumentRecord])
+async def list_documents(book_id: str, user_id: str = Depends(get_current_user_id)):
+    client = _get_supabase()
+    if client is None:
+        return []
     try:
-        client.table("learn_books").delete().eq("id", book_id).eq("user_id", user_id).execute()
+        response = (
+            client.table("learn_book_documents")
+            .select("*")
+            .eq("book_id", book_id)
+            .eq("user_id", user_id)
+            .order("created_at")
+            .execute()
+        )
     except Exception as exc:
         _handle_db_error(exc)
+    return response.data or []
 
 
-# ── PDF Upload ────────────────────────────────────────────────────────────────
-
-@router.post("/{book_id}/upload-pdf", response_model=PdfUploadResponse)
-async def upload_pdf(
+@router.post(
+    "/{book_id}/documents",
+    response_model=List[LearnBookDocumentRecord],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_documents(
     book_id: str,
-    file: UploadFile = File(...),
+    files: List[UploadFile] = File(...),
     user_id: str = Depends(get_current_user_id),
 ):
-    """Accept a PDF upload, chunk it, and index it into Qdrant cloud."""
-    if not file.content_type or "pdf" not in file.content_type.lower():
-        # Also allow octet-stream uploads from some browsers
-        if file.filename and not file.filename.lower().endswith(".pdf"):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only PDF files are accepted.",
-            )
+    """
+    Attach PDFs to a book.  Each becomes a document indexed by its own
+    background job, so several PDFs are ingested in parallel into the book's
+    collection.
+    """
+    if not all(_is_pdf(file) for file in files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are accepted.",
+        )
 
     client = _get_supabase()
     if client is None:
@@ -211,28 +304,122 @@ async def upload_pdf(
     if not resp.data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
 
-    pdf_bytes = await file.read()
     collection_name = f"learn-book-{book_id}"
+    queue = get_ingest_queue()
+    documents = []
+    for file in files:
+        filename = file.filename or "PDF"
+        try:
+            inserted = (
+                client.table("learn_book_documents")
+                .insert({"book_id": book_id, "user_id": user_id, "filename": filename})
+                .execute()
+            )
+        except Exception as exc:
+            _handle_db_error(exc)
+        document = inserted.data[0]
 
+        try:
+            job = queue.submit(
+                book_id=book_id,
+                user_id=user_id,
+                collection_name=collection_name,
+                source=filename,
+                pdf_bytes=await file.read(),
+                document_id=document["id"],
+            )
+        except Exception as exc:
+            logger.error("Could not queue document %s: %s", document["id"], exc, exc_info=True)
+            try:
+                client.table("learn_book_documents").update(
+                    {"status": "failed", "error": str(exc)}
+                ).eq("id", document["id"]).execute()
+            except Exception as update_exc:
+                logger.warning("Could not mark document %s failed: %s", document["id"], update_exc)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Could not queue {filename} for indexing",
+            )
+        try:
+            client.table("learn_book_documents").update({"job_id": job.job_id}).eq(
+                "id", document["id"]
+            ).execute()
+        except Exception as exc:
+            logger.warning("Could not record job id for document %s: %s", document["id"], exc)
+        documents.append({**document, "job_id": job.job_id})
+    return documents
+
+
+@router.delete("/{book_id}/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(
+    book_id: str,
+    document_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Remove one PDF from a book, together with only its vectors."""
+    client = _get_supabase()
+    if client is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database not configured",
+        )
+    try:
+        resp = (
+            client.table("learn_book_documents")
+            .select("status,job_id")
+            .eq("id", document_id)
+            .eq("book_id", book_id)
+            .eq("user_id", user_id)
+            .single()
+            .execute()
+        )
+    except Exception as exc:
+        _handle_db_error(exc)
+    if not resp.data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    # A row can stay queued/running after its job is gone (restart, failed submit).
+    job = get_ingest_queue().get(resp.data.get("job_id") or "")
+    if job is not None and job.status in ("queued", "running"):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document is still being indexed",
+        )
+
+    from backend.services import rag_service
+
+    collection_name = f"learn-book-{book_id}"
     try:
-        from backend.services.rag_service import index_pdf
-        chunks_indexed = index_pdf(pdf_bytes, collection_name)
+        await asyncio.to_thread(rag_service.delete_document, collection_name, document_id)
     except Exception as exc:
-        logger.error("PDF indexing failed: %s", exc, exc_info=True)
+        logger.error("Could not delete vectors of document %s: %s", document_id, exc, exc_info=True)
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"PDF indexing failed: {exc}",
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Could not delete the document's vectors",
         )
 
-    # Update the book record to mark it has a PDF
     try:
-        client.table("learn_books").update(
-            {"has_pdf": True, "pdf_collection_name": collection_name}
-        ).eq("id", book_id).eq("user_id", user_id).execute()
+        client.table("learn_book_documents").delete().eq("id", document_id).eq(
+            "user_id", user_id
+        ).execute()
+        if await asyncio.to_thread(rag_service.count_vectors, collection_name) == 0:
+            client.table("learn_books").update({"has_pdf": False}).eq("id", book_id).eq(
+                "user_id", user_id
+            ).execute()
     except Exception as exc:
         _handle_db_error(exc)
 
-    return PdfUploadResponse(collection_name=collection_name, chunks_indexed=chunks_indexed)
+
+@router.get("/{book_id}/ingest-jobs/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(
+    book_id: str,
+    job_id: str,
+    user_id: str = Depends(get_current_user_id),
+):
+    """Progress of a background PDF ingestion job."""
+    job = get_ingest_queue().get(job_id)
+    if job is None or job.book_id != book_id or job.user_id != user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return IngestJobStatus(**asdict(job))
 
 
 # ── AI Generation ─────────────────────────────────────────────────────────────
@@ -292,8 +479,8 @@ async def ai_process(
 
     if book.get("has_pdf") and book.get("pdf_collection_name"):
         try:
-            from backend.services.rag_service import search_context
-            rag_context, rag_sources = search_context(
+            from backend.services.rag_service import asearch_context
+            rag_context, rag_sources = await asearch_context(
                 prompt, book["pdf_collection_name"], k=3
             )
         except Exception as exc:
@@ -321,3 +508,64 @@ async def ai_process(
         )
 
     return LearnAIProcessResponse(intent="generate", learn_response=learn_response)
+
+
+# ── PDF Q&A (streaming) ───────────────────────────────────────────────────────
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/{book_id}/ask")
+async def ask_book(
+    book_id: str,
+    body: LearnAskRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    Answer a question from the book's PDF as Server-Sent Events:
+    one ``sources`` event, then ``token`` events, then ``done`` (or ``error``).
+    """
+    client = _get_supabase()
+    if client is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database not configured",
+        )
+    try:
+        book_resp = (
+            client.table("learn_books")
+            .select("has_pdf,pdf_collection_name")
+            .eq("id", book_id)
+            .eq("user_id", user_id)
+            .single()
+            .execute()
+        )
+    except Exception as exc:
+        _handle_db_error(exc)
+    if not book_resp.data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    if not (book_resp.data.get("has_pdf") and book_resp.data.get("pdf_collection_name")):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Book has no indexed PDF")
+
+    from backend.services.rag_service import astream_answer
+
+    collection_name = book_resp.data["pdf_collection_name"]
+
+    async def _events() -> AsyncIterator[str]:
+        try:
+            async for kind, value in astream_answer(body.question.strip(), collection_name, body.k):
+                if kind == "sources":
+                    yield _sse("sources", {"sources": value})
+                else:
+                    yield _sse("token", {"text": value})
+            yield _sse("done", {})
+        except Exception as exc:
+            logger.error("Streaming answer failed: %s", exc, exc_info=True)
+            yield _sse("error", {"detail": str(exc)})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
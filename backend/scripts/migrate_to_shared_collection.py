@@ -0,0 +1,103 @@
+"""
+migrate_to_shared_collection.py — copy per-book Qdrant collections into the shared one.
+
+Every ``learn-book-{book_id}`` collection is scrolled in batches and its points
+are upserted into the shared collection (QDRANT_SHARED_COLLECTION) with a
+``book_id`` payload field.  Point ids are kept, so an interrupted run can simply
+be started again.  A source collection is only dropped with --delete-source,
+and only after the shared collection holds as many points for that book.
+
+Usage (from the workspace root, with QDRANT_URL etc. set):
+    python -m backend.scripts.migrate_to_shared_collection [--delete-source] [--dry-run]
+
+Afterwards set QDRANT_STORAGE_MODE=shared and restart the backend.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+
+from backend.env_loader import load_backend_env
+from backend.services.rag_service import (
+    BOOK_COLLECTION_PREFIX,
+    _book_filter,
+    _ensure_collection,
+    _make_client,
+    book_id_from_collection,
+    shared_collection_name,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_collection(source: str, target: str, batch_size: int) -> int:
+    from qdrant_client.http.models import PointStruct
+
+    client = _make_client()
+    book_id = book_id_from_collection(source)
+    dim = client.get_collection(source).config.params.vectors.size
+    _ensure_collection(target, dim, shared=True)
+
+    copied = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            client.upsert(
+                collection_name=target,
+                points=[
+                    PointStruct(id=p.id, vector=p.vector, payload={**(p.payload or {}), "book_id": book_id})
+                    for p in points
+                ],
+            )
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--delete-source", action="store_true", help="drop each per-book collection once copied")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be migrated")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    load_backend_env()
+
+    client = _make_client()
+    target = shared_collection_name()
+    sources = sorted(
+        c.name for c in client.get_collections().collections
+        if c.name.startswith(BOOK_COLLECTION_PREFIX) and c.name != target
+    )
+    logger.info("Found %d per-book collections to migrate into '%s'", len(sources), target)
+
+    for source in sources:
+        expected = client.count(source, exact=True).count
+        if args.dry_run:
+            logger.info("%s: %d points", source, expected)
+            continue
+
+        copied = migrate_collection(source, target, args.batch_size)
+        stored = client.count(
+            target, count_filter=_book_filter(book_id_from_collection(source)), exact=True
+        ).count
+        logger.info("%s: copied %d points (%d now in '%s')", source, copied, stored, target)
+
+        if args.delete_source:
+            if stored >= expected:
+                client.delete_collection(source)
+                logger.info("%s: dropped", source)
+            else:
+                logger.warning("%s: kept, shared copy has %d of %d points", source, stored, expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+reclaim_orphaned_vectors.py — one-off orphan GC pass outside the API server.
+
+Lists every book id that still has vectors (per-book collections, the shared
+collection, local stores), looks them up in ``learn_books`` and purges the
+vectors of books that no longer exist.  Unlike the background reconciler it
+does not wait for a second pass before purging.
+
+Usage (from the workspace root, with QDRANT_URL and SUPABASE_* set):
+    python -m backend.scripts.reclaim_orphaned_vectors [--dry-run] [--max-deletes 500]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+
+from backend.env_loader import load_backend_env
+from backend.services.collection_gc import OrphanReconciler
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="only report orphans, purge nothing")
+    parser.add_argument("--max-deletes", type=int, default=500)
+    parser.add_argument("--delete-delay", type=float, default=0.2, help="seconds between purges")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    load_backend_env()
+
+    reconciler = OrphanReconciler(max_deletes=args.max_deletes, delete_delay_s=args.delete_delay)
+    report = reconciler.run_once(confirm=False, dry_run=args.dry_run)
+    for book_id in report.purged_books:
+        logger.info("Purged learn-book-%s", book_id)
+    if report.deferred:
+        logger.info("%d orphaned book(s) left for a later run", report.deferred)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import logging
+import re
+import threading
 from typing import Optional
 
 from langchain_core.prompts import ChatPromptTemplate
 
 from backend.models.schemas import CodeResponse, LanguageType
+from backend.services.execution_service import validate_python
 from backend.services.llm_service import LLMConfig, build_llm
 
+logger = logging.getLogger(__name__)
+
+# Upper bound on targeted repair calls per generation.
+_MAX_REPAIR_ATTEMPTS = 2
+
+_FENCE_BLOCK_RE = re.compile(r"(?:```|~~~)[\w+-]*[ \t]*\n(.*?)\n?(?:```|~~~)", re.DOTALL)
+_FENCE_LINE_RE = re.compile(r"^\s*(?:```|~~~)[\w+-]*\s*$", re.MULTILINE)
+
 
 _HTML_KEYWORDS = {
     "html", "webpage", "web page", "website", "css",
@@ -59,4 +71,82 @@ STRICT RULES — violating any rule causes a sandbox error:
 
     chain = prompt_tmpl | llm
     code = chain.invoke({"prompt": prompt, "language": language.value}).content
+    code = _validate_and_repair(code, language, llm)
     return CodeResponse(language=language, code=code)
+
+
+# ── Post-generation validation ────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats = {
+    "generated": 0,
+    "fences_stripped": 0,
+    "invalid": 0,
+    "repair_calls": 0,
+    "repaired": 0,
+    "repair_failed": 0,
+}
+
+
+def _count(**increments: int) -> None:
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def codegen_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def strip_fences(text: str) -> str:
+    """Remove markdown fences; a fenced block wins over surrounding prose."""
+    blocks = _FENCE_BLOCK_RE.findall(text)
+    if blocks:
+        return max(blocks, key=len).strip("\n")
+    return _FENCE_LINE_RE.sub("", text).strip("\n")
+
+
+def _repair_code(code: str, problem: str, language: LanguageType, llm) -> str:
+    banned_list = ", ".join(_SANDBOX_BANNED)
+    system = f"""You repair code for a sandboxed Python runner.
+
+Fix ONLY the reported problem and keep everything else unchanged.
+The code MUST NOT import these banned modules: {banned_list}
+Do NOT use `open()`, `eval()`, `exec()`, `compile()` or `__import__()`.
+Return ONLY raw code. No markdown fences, no prose.
+"""
+    user = "Language: {language}\nProblem: {problem}\n\nCode:\n{code}"
+    prompt_tmpl = ChatPromptTemplate.from_messages([("system", system), ("user", user)])
+    chain = prompt_tmpl | llm
+    return chain.invoke({"language": language.value, "problem": problem, "code": code}).content
+
+
+def _validate_and_repair(raw: str, language: LanguageType, llm) -> str:
+    """Strip fences and, for Python, make sure the sandbox will accept the code.
+
+    A targeted repair call is made only when validation fails, at most
+    ``_MAX_REPAIR_ATTEMPTS`` times; the best effort is returned either way.
+    """
+    code = strip_fences(raw)
+    _count(generated=1, fences_stripped=int(code != raw.strip("\n")))
+    if language != LanguageType.PYTHON:
+        return code
+
+    problem = validate_python(code)
+    if problem is None:
+        return code
+
+    _count(invalid=1)
+    for attempt in range(1, _MAX_REPAIR_ATTEMPTS + 1):
+        logger.info("Generated code failed validation (%s); repair attempt %d", problem, attempt)
+        _count(repair_calls=1)
+        code = strip_fences(_repair_code(code, problem, language, llm))
+        problem = validate_python(code)
+        if problem is None:
+            _count(repaired=1)
+            return code
+
+    _count(repair_failed=1)
+    logger.warning("Generated code still invalid after %d repairs: %s", _MAX_REPAIR_ATTEMPTS, problem)
+    return code
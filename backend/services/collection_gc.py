@@ -0,0 +1,189 @@
+"""
+collection_gc.py — background reconciler for orphaned learn-book vectors.
+
+Book deletion no longer waits on Qdrant, a failed vector delete is only
+logged, and books removed by the ``auth.users`` cascade never reach
+delete_book at all.  Their vectors would stay in RAM forever.
+
+Every pass lists the book ids that still have vectors (per-book collections,
+the shared collection and local stores; see rag_service.stored_book_ids),
+checks them against ``learn_books`` in batches and purges the ones whose row
+is gone.  A book is only purged once it has been orphaned for two passes in a
+row, so a row that is momentarily invisible (or a book created between the
+listing and the lookup) is never lost.  Deletes are rate limited and capped
+per pass so a large backlog does not hammer Qdrant.
+
+Lookups need SUPABASE_SERVICE_ROLE_KEY: with the anon key row-level security
+hides every book, which would make all of them look orphaned.
+
+Configuration:
+  RAG_GC_ENABLED           1/0 (default 1)
+  RAG_GC_INTERVAL_S        seconds between passes (default 3600)
+  RAG_GC_INITIAL_DELAY_S   seconds after startup before the first pass (default 60)
+  RAG_GC_BATCH_SIZE        book ids per learn_books lookup (default 100)
+  RAG_GC_MAX_DELETES       orphaned books purged per pass (default 50)
+  RAG_GC_DELETE_DELAY_S    pause between purges (default 1.0)
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set
+
+from backend.db.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def gc_enabled() -> bool:
+    return os.environ.get("RAG_GC_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+@dataclass
+class GCReport:
+    books_with_vectors: int = 0
+    orphans: int = 0
+    purged_books: List[str] = field(default_factory=list)
+    purged_points: int = 0
+    deferred: int = 0  # orphans seen for the first time, or over the per-pass cap
+    failed: int = 0
+    elapsed_s: float = 0.0
+
+
+class OrphanReconciler:
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        max_deletes: Optional[int] = None,
+        delete_delay_s: Optional[float] = None,
+    ) -> None:
+        self._batch_size = max(1, batch_size or _env_number("RAG_GC_BATCH_SIZE", 100))
+        self._max_deletes = max_deletes or _env_number("RAG_GC_MAX_DELETES", 50)
+        self._delete_delay_s = (
+            delete_delay_s if delete_delay_s is not None else _env_number("RAG_GC_DELETE_DELAY_S", 1.0, float)
+        )
+        self._suspects: Set[str] = set()
+        self._stop = threading.Event()
+        self.last_report: Optional[GCReport] = None
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _existing_books(self, book_ids: Iterable[str]) -> Set[str]:
+        if not os.environ.get("SUPABASE_SERVICE_ROLE_KEY"):
+            raise RuntimeError("Orphan GC needs SUPABASE_SERVICE_ROLE_KEY to see every learn book")
+        client = get_supabase_client()
+        ids = sorted(book_ids)
+        existing: Set[str] = set()
+        for start in range(0, len(ids), self._batch_size):
+            response = (
+                client.table("learn_books")
+                .select("id")
+                .in_("id", ids[start:start + self._batch_size])
+                .execute()
+            )
+            existing.update(str(row["id"]) for row in response.data or [])
+        return existing
+
+    def run_once(self, confirm: bool = True, dry_run: bool = False) -> GCReport:
+        """
+        One reconcile pass.  With ``confirm`` an orphan must also have been
+        seen by the previous pass before it is purged.
+        """
+        from backend.services.rag_service import purge_book, stored_book_ids
+
+        started = time.perf_counter()
+        report = GCReport()
+        stored = {book_id for book_id in stored_book_ids() if _is_uuid(book_id)}
+        report.books_with_vectors = len(stored)
+
+        orphans = stored - self._existing_books(stored) if stored else set()
+        report.orphans = len(orphans)
+        due = sorted(orphans & self._suspects) if confirm else sorted(orphans)
+        if dry_run:
+            due = []
+        self._suspects = set(orphans)
+
+        for book_id in due:
+            if self._stop.is_set() or len(report.purged_books) >= self._max_deletes:
+                break
+            try:
+                report.purged_points += purge_book(book_id)
+                report.purged_books.append(book_id)
+                self._suspects.discard(book_id)
+            except Exception as exc:
+                report.failed += 1
+                logger.warning("Could not purge vectors of deleted book %s: %s", book_id, exc)
+            self._stop.wait(self._delete_delay_s)
+        report.deferred = report.orphans - len(report.purged_books) - report.failed
+
+        report.elapsed_s = time.perf_counter() - started
+        self.last_report = report
+        logger.info(
+            "Orphan GC | books with vectors=%d | orphans=%d | purged books=%d | purged points=%d | "
+            "deferred=%d | failed=%d | %.1fs",
+            report.books_with_vectors, report.orphans, len(report.purged_books),
+            report.purged_points, report.deferred, report.failed, report.elapsed_s,
+        )
+        return report
+
+    async def run_forever(self, interval_s: float, initial_delay_s: float = 0.0) -> None:
+        """Reconcile every ``interval_s`` seconds until cancelled."""
+        try:
+            await asyncio.sleep(initial_delay_s)
+            while True:
+                try:
+                    await asyncio.to_thread(self.run_once)
+                except Exception as exc:
+                    logger.warning("Orphan GC pass failed: %s", exc)
+                await asyncio.sleep(interval_s)
+        finally:
+            self.stop()  # let a pass running in its thread finish early
+
+
+_reconciler: Optional[OrphanReconciler] = None
+_reconciler_lock = threading.Lock()
+
+
+def get_reconciler() -> OrphanReconciler:
+    global _reconciler
+    with _reconciler_lock:
+        if _reconciler is None:
+            _reconciler = OrphanReconciler()
+        return _reconciler
+
+
+def start_reconciler() -> Optional[asyncio.Task]:
+    """Schedule the periodic reconciler on the running loop (None if disabled)."""
+    if not gc_enabled():
+        return None
+    if not (os.environ.get("SUPABASE_URL") and os.environ.get("SUPABASE_SERVICE_ROLE_KEY")):
+        logger.info("Orphan GC disabled: SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY not configured")
+        return None
+    return asyncio.create_task(
+        get_reconciler().run_forever(
+            interval_s=_env_number("RAG_GC_INTERVAL_S", 3600.0, float),
+            initial_delay_s=_env_number("RAG_GC_INITIAL_DELAY_S", 60.0, float),
+        ),
+        name="orphan-gc",
+    )
@@ -0,0 +1,166 @@
+"""
+context_compression.py — shrink retrieved chunks before they reach a prompt.
+
+search_context over-fetches candidates, then:
+  1. MMR picks k chunks that are relevant to the query but not to each other,
+     so near-identical chunks do not fill the k slots.
+  2. The chosen chunks are split into sentences, embedded in one batch, and
+     the sentences closest to the query are kept, best first, until the token
+     budget is spent.
+  3. Kept sentences are put back in reading order under a ``[Page N — source]``
+     header per chunk, so page citations survive compression.
+
+Configuration:
+  RAG_COMPRESSION            1/0 (default 1)
+  RAG_OVERFETCH              candidates fetched per requested chunk (default 4)
+  RAG_MMR_LAMBDA             relevance vs. diversity trade-off, 0..1 (default 0.5)
+  RAG_CONTEXT_TOKEN_BUDGET   approximate tokens of context per prompt (default 600)
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Awaitable, Callable, List, Sequence, Tuple
+
+import numpy as np
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n{2,}|\n(?=\s*(?:[-•*]|\d+[.)])\s)")
+_MIN_SENTENCE_CHARS = 20
+_CHARS_PER_TOKEN = 4
+
+Hit = Tuple[dict, Sequence[float]]  # (payload, vector)
+
+
+def enabled() -> bool:
+    return os.environ.get("RAG_COMPRESSION", "1").strip().lower() not in ("0", "false", "no")
+
+
+def overfetch() -> int:
+    return max(1, int(os.environ.get("RAG_OVERFETCH", "4")))
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // _CHARS_PER_TOKEN)
+
+
+def citation(payload: dict) -> str:
+    meta = payload.get("metadata") or {}
+    return f"Page {meta.get('page', '?')} — {meta.get('source', 'PDF')}"
+
+
+def mmr(query: np.ndarray, candidates: np.ndarray, k: int, lambda_: float) -> List[int]:
+    """Indices of k candidates by maximal marginal relevance, in selection order."""
+    query, candidates = _unit(query), _unit(candidates)
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+    chosen: List[int] = [int(np.argmax(relevance))]
+    while len(chosen) < min(k, len(candidates)):
+        redundancy = similarity[:, chosen].max(axis=1)
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[chosen] = -np.inf
+        chosen.append(int(np.argmax(scores)))
+    return chosen
+
+
+def split_sentences(text: str) -> List[str]:
+    parts = [" ".join(part.split()) for part in _SENTENCE_RE.split(text)]
+    sentences: List[str] = []
+    for part in parts:
+        if not part:
+            continue
+        # Glue fragments ("e.g.", headings) onto the previous sentence.
+        if sentences and len(part) < _MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+Sentence = Tuple[int, int, str]  # (chunk rank, position in chunk, text)
+
+
+def _prepare(query_vector: Sequence[float], hits: Sequence[Hit], k: int) -> Tuple[List[int], List[Sentence]]:
+    """MMR-select k hits and split them into sentences."""
+    lambda_ = float(os.environ.get("RAG_MMR_LAMBDA", "0.5"))
+    query = np.asarray(query_vector, dtype=np.float32)
+    chosen = mmr(query, np.asarray([vector for _, vector in hits], dtype=np.float32), k, lambda_)
+    sentences = [
+        (rank, position, sentence)
+        for rank, index in enumerate(chosen)
+        for position, sentence in enumerate(split_sentences(hits[index][0].get("page_content", "")))
+    ]
+    return chosen, sentences
+
+
+def _assemble(
+    query_vector: Sequence[float],
+    hits: Sequence[Hit],
+    chosen: List[int],
+    sentences: List[Sentence],
+    sentence_vectors: Sequence[Sequence[float]],
+) -> Tuple[str, List[str]]:
+    """Keep the best sentences under the token budget and rebuild cited blocks."""
+    budget = int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", "600"))
+    query = _unit(np.asarray(query_vector, dtype=np.float32))
+    scores = _unit(np.asarray(sentence_vectors, dtype=np.float32)) @ query
+
+    kept: List[Sentence] = []
+    seen = set()
+    used = 0
+    for i in np.argsort(-scores):
+        rank, position, text = sentences[i]
+        key = text.lower()
+        cost = estimate_tokens(text)
+        if key in seen or (kept and used + cost > budget):
+            continue
+        seen.add(key)
+        kept.append((rank, position, text))
+        used += cost
+
+    blocks: List[str] = []
+    sources: List[str] = []
+    for rank, index in enumerate(chosen):
+        picked = sorted((position, text) for r, position, text in kept if r == rank)
+        if not picked:
+            continue
+        source = citation(hits[index][0])
+        if source not in sources:  # several chunks of one page share a citation
+            sources.append(source)
+        blocks.append(f"[{source}]\n" + " ".join(text for _, text in picked))
+    return "\n\n".join(blocks), sources
+
+
+def compress(
+    query_vector: Sequence[float],
+    hits: Sequence[Hit],
+    k: int,
+    embed_documents: Callable[[List[str]], Sequence[Sequence[float]]],
+) -> Tuple[str, List[str]]:
+    """Return (context, sources) built from the best sentences of k MMR-selected hits."""
+    if not hits:
+        return "", []
+    chosen, sentences = _prepare(query_vector, hits, k)
+    if not sentences:
+        return "", []
+    vectors = embed_documents([text for _, _, text in sentences])
+    return _assemble(query_vector, hits, chosen, sentences, vectors)
+
+
+async def acompress(
+    query_vector: Sequence[float],
+    hits: Sequence[Hit],
+    k: int,
+    aembed_documents: Callable[[List[str]], Awaitable[List[List[float]]]],
+) -> Tuple[str, List[str]]:
+    """``compress`` with an async embedding call."""
+    if not hits:
+        return "", []
+    chosen, sentences = _prepare(query_vector, hits, k)
+    if not sentences:
+        return "", []
+    vectors = await aembed_documents([text for _, _, text in sentences])
+    return _assemble(query_vector, hits, chosen, sentences, vectors)
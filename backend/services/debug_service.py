@@ -4,7 +4,9 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from backend.models.schemas import DebugResponse, LanguageType
+from backend.services.execution_service import run_python, stdin_exhausted, trim_traceback
 from backend.services.llm_service import LLMConfig, build_llm
+from backend.services.quickfix_service import record_debug_request, record_local_resolution, try_quick_fix
 
 # Keep in sync with execution_service._BANNED_MODULES
 _SANDBOX_BANNED = (
@@ -62,3 +64,53 @@ RULES:
     if not result.language:
         result = result.model_copy(update={"language": language})
     return result
+
+
+def debug_with_runtime_check(
+    code: str,
+    language: LanguageType,
+    error_message: str,
+    model: str,
+) -> DebugResponse:
+    """Run Python code in the sandbox before debugging it.
+
+    Clean runs with no reported symptom are answered without an LLM call;
+    mechanical failures are tried against the local quick-fix rules, and
+    anything else hands the real (trimmed) traceback to ``debug_code``.  A run
+    that only failed for lack of stdin is inconclusive and is not reported.
+    """
+    record_debug_request()
+    if language != LanguageType.PYTHON:
+        return debug_code(code, language, error_message, model)
+
+    result = run_python(code)
+    if stdin_exhausted(result):
+        # The pre-run has no input to give; an EOFError here is not a bug.
+        return debug_code(code, language, error_message, model)
+    if result.exit_code == 0 and not result.timed_out:
+        if not error_message.strip():
+            record_local_resolution()
+            return DebugResponse(
+                issue_summary="No runtime errors \u2014 the code ran cleanly.",
+                fixed_code=code,
+                language=language,
+            )
+        # Runs fine but the user reports a symptom: a logic bug for the LLM.
+        return debug_code(code, language, error_message, model)
+
+    if not result.timed_out:
+        quick_fix = try_quick_fix(code, result.stderr)
+        if quick_fix is not None:
+            record_local_resolution()
+            return quick_fix
+
+    if result.timed_out:
+        runtime_error = "Execution timed out \u2014 possible infinite loop."
+    else:
+        runtime_error = trim_traceback(result.stderr)
+
+    if error_message.strip():
+        error_message = f"{error_message}\n\nSandbox traceback:\n{runtime_error}"
+    else:
+        error_message = runtime_error
+    return debug_code(code, language, error_message, model)
@@ -0,0 +1,195 @@
+"""
+dedupe_service.py — boilerplate stripping and near-duplicate chunk filtering.
+
+Textbook PDFs repeat running headers, footers, copyright notices and other
+boilerplate on many pages.  Two ingest-time filters keep that out of Qdrant:
+
+  BoilerplateStripper  learns lines that recur at the top or bottom of many
+                       pages (digits normalised, so "Page 12" matches "Page 13")
+                       from a look-ahead window, then strips them from every page.
+  NearDuplicateFilter  MinHash signatures over word shingles, bucketed with
+                       LSH; a chunk whose estimated Jaccard similarity to an
+                       already kept chunk reaches the threshold is dropped.
+
+Both work on streams, so memory stays bounded by the look-ahead window and one
+small signature per kept chunk.
+
+Configuration:
+  INGEST_STRIP_BOILERPLATE        1/0 (default 1)
+  INGEST_BOILERPLATE_LOOKAHEAD    pages buffered before learning (default 20)
+  INGEST_BOILERPLATE_MIN_FRACTION share of pages a line must recur on (default 0.5)
+  INGEST_DEDUPE                   1/0 (default 1)
+  INGEST_DEDUPE_THRESHOLD         Jaccard similarity treated as duplicate (default 0.85)
+  INGEST_MINHASH_PERMUTATIONS     signature length (default 64)
+  INGEST_LSH_BANDS                LSH bands; must divide the signature length (default 16)
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+_SHINGLE_WORDS = 5
+_EDGE_LINES = 3  # lines at the top and bottom of a page that may be boilerplate
+_MIN_PAGES_TO_LEARN = 3
+
+_DIGITS_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_enabled(name: str) -> bool:
+    return os.environ.get(name, "1").strip().lower() not in ("0", "false", "no")
+
+
+def _normalize_line(line: str) -> str:
+    return _SPACE_RE.sub(" ", _DIGITS_RE.sub("#", line)).strip().lower()
+
+
+# ── Header / footer stripping ─────────────────────────────────────────────────
+
+class BoilerplateStripper:
+    def __init__(self, lookahead: Optional[int] = None, min_fraction: Optional[float] = None) -> None:
+        self._lookahead = max(1, lookahead or int(_env_float("INGEST_BOILERPLATE_LOOKAHEAD", 20)))
+        self._min_fraction = min_fraction or _env_float("INGEST_BOILERPLATE_MIN_FRACTION", 0.5)
+        self._counts: Counter = Counter()
+        self._pages_seen = 0
+        self.lines_removed = 0
+
+    @staticmethod
+    def _edges(lines: List[str]) -> List[Tuple[int, str]]:
+        """(index, normalised text) of the non-empty lines at either edge of a page."""
+        content = [(i, _normalize_line(line)) for i, line in enumerate(lines) if line.strip()]
+        if len(content) <= 2 * _EDGE_LINES:
+            return content
+        return content[:_EDGE_LINES] + content[-_EDGE_LINES:]
+
+    def _learn(self, lines: List[str]) -> None:
+        self._pages_seen += 1
+        self._counts.update({text for _, text in self._edges(lines)})
+
+    def _is_boilerplate(self, text: str) -> bool:
+        if self._pages_seen < _MIN_PAGES_TO_LEARN:
+            return False
+        return self._counts[text] >= max(2, self._min_fraction * self._pages_seen)
+
+    def _strip(self, page: "Document") -> "Document":
+        lines = page.page_content.splitlines()
+        drop = {i for i, text in self._edges(lines) if self._is_boilerplate(text)}
+        if drop:
+            self.lines_removed += len(drop)
+            page.page_content = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+        return page
+
+    def run(self, pages: Iterable["Document"]) -> Iterator["Document"]:
+        """Buffer the look-ahead window, then keep learning while streaming."""
+        buffered: List["Document"] = []
+        for page in pages:
+            self._learn(page.page_content.splitlines())
+            if len(buffered) < self._lookahead:
+                buffered.append(page)
+                continue
+            for held in buffered:
+                yield self._strip(held)
+            buffered = []
+            yield self._strip(page)
+        for held in buffered:
+            yield self._strip(held)
+
+
+# ── MinHash / LSH near-duplicate filter ───────────────────────────────────────
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finaliser; uint64 arithmetic wraps, which is what we want."""
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _WORD_RE.findall(_DIGITS_RE.sub("#", text.lower()))
+    if len(words) < _SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + _SHINGLE_WORDS]) for i in range(len(words) - _SHINGLE_WORDS + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class NearDuplicateFilter:
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        permutations: Optional[int] = None,
+        bands: Optional[int] = None,
+    ) -> None:
+        self.threshold = threshold or _env_float("INGEST_DEDUPE_THRESHOLD", 0.85)
+        permutations = permutations or int(_env_float("INGEST_MINHASH_PERMUTATIONS", 64))
+        self._bands = bands or int(_env_float("INGEST_LSH_BANDS", 16))
+        if permutations % self._bands:
+            raise ValueError("INGEST_MINHASH_PERMUTATIONS must be a multiple of INGEST_LSH_BANDS")
+        self._rows = permutations // self._bands
+        seeds = np.random.default_rng(0x5EED).integers(0, 2**63, size=permutations, dtype=np.uint64)
+        self._seeds = seeds.reshape(-1, 1)
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        self._signatures: List[np.ndarray] = []
+        self.duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = _shingle_hashes(text)
+        return _mix64(hashes[np.newaxis, :] ^ self._seeds).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self._rows:(band + 1) * self._rows].tobytes())
+            for band in range(self._bands)
+        ]
+
+    def is_duplicate(self, text: str) -> bool:
+        """True if ``text`` nearly matches a kept chunk; otherwise keep it."""
+        signature = self.signature(text)
+        keys = self._band_keys(signature)
+        candidates = {index for key in keys for index in self._buckets.get(key, ())}
+        for index in candidates:
+            if np.mean(self._signatures[index] == signature) >= self.threshold:
+                self.duplicates += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets[key].append(index)
+        return False
+
+    def run(self, chunks: Iterable["Document"]) -> Iterator["Document"]:
+        for chunk in chunks:
+            if not self.is_duplicate(chunk.page_content):
+                yield chunk
+
+
+# ── Pipeline helpers ──────────────────────────────────────────────────────────
+
+def boilerplate_stripper() -> Optional[BoilerplateStripper]:
+    return BoilerplateStripper() if _env_enabled("INGEST_STRIP_BOILERPLATE") else None
+
+
+def near_duplicate_filter() -> Optional[NearDuplicateFilter]:
+    return NearDuplicateFilter() if _env_enabled("INGEST_DEDUPE") else None
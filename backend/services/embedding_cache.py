@@ -0,0 +1,371 @@
+"""
+embedding_cache.py — persistent, content-addressed embedding cache.
+
+Vectors are keyed by (embedding model, SHA-256 of the text) so re-uploading the
+same or a lightly edited PDF, or asking the same question again, skips the
+embedding call entirely.
+
+On-disk layout (under EMBED_CACHE_DIR):
+  index.sqlite        key → slot index + row checksum, last-used time, free slots
+  <model-hash>.f32    one memory-mapped float32 matrix per cache key (embedding
+                      model + "doc"/"query"/"sentence" namespace), one row per slot
+
+The API server and the LiveKit agent share the directory.  Readers do not
+lock against writers in the other process, so a row may be evicted and
+overwritten between looking up its slot and reading it; every row therefore
+carries a checksum that is verified after the read, and a mismatch is a miss.
+
+EMBED_CACHE_MAX_MB caps each key's matrix, not the directory as a whole: with
+one active model the cache holds at most three full matrices (PDF chunks,
+questions and the sentences context compression embeds), and every model used
+since the cache was created keeps its own files.  When a matrix is full its least recently used rows are evicted and
+reused; matrix files never shrink, so delete the directory after switching
+embedding models to reclaim the old model's files.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.services.embedding_service import embed_documents_array
+
+logger = logging.getLogger(__name__)
+
+_GROW_ROWS = 1024
+_EVICT_FRACTION = 0.1
+_SCHEMA_VERSION = 1  # 1: entries.checksum
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS arrays (
+    model  TEXT PRIMARY KEY,
+    file   TEXT NOT NULL,
+    dim    INTEGER NOT NULL,
+    rows   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    model      TEXT NOT NULL,
+    digest     BLOB NOT NULL,
+    slot       INTEGER NOT NULL,
+    checksum   BLOB NOT NULL,
+    last_used  REAL NOT NULL,
+    PRIMARY KEY (model, digest)
+);
+CREATE INDEX IF NOT EXISTS entries_lru_idx ON entries(model, last_used);
+CREATE TABLE IF NOT EXISTS free_slots (
+    model  TEXT NOT NULL,
+    slot   INTEGER NOT NULL,
+    PRIMARY KEY (model, slot)
+);
+"""
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def _checksum(row: np.ndarray) -> bytes:
+    return hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float32).tobytes(), digest_size=8).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, directory: str | os.PathLike, max_bytes: int) -> None:
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self._dir / "index.sqlite", check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self._maps: Dict[str, np.memmap] = {}
+
+    def _migrate(self) -> None:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+                # Older indexes have no row checksums; it is only a cache, start over.
+                for table in ("arrays", "entries", "free_slots"):
+                    self._db.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    self._db.execute(statement)
+            self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    # ── Matrix files ──────────────────────────────────────────────────────────
+
+    def _array_info(self, model: str) -> Optional[Tuple[str, int, int]]:
+        return self._db.execute(
+            "SELECT file, dim, rows FROM arrays WHERE model = ?", (model,)
+        ).fetchone()
+
+    def _capacity(self, dim: int) -> int:
+        # Per cache key (model + namespace), see the module docstring.
+        return max(1, self._max_bytes // (dim * 4))
+
+    def _matrix(self, model: str, file: str, dim: int, rows: int) -> np.memmap:
+        """Memory-map the model's matrix, remapping if another writer grew it."""
+        current = self._maps.get(model)
+        if current is None or current.shape[0] < rows:
+            self._maps[model] = np.memmap(self._dir / file, dtype=np.float32, mode="r+", shape=(rows, dim))
+        return self._maps[model]
+
+    def _allocate(self, model: str, dim: int, count: int) -> List[int]:
+        """Reserve ``count`` slots; must run inside a write transaction."""
+        info = self._array_info(model)
+        if info is None:
+            file = hashlib.sha1(model.encode()).hexdigest()[:16] + ".f32"
+            self._db.execute(
+                "INSERT INTO arrays (model, file, dim, rows) VALUES (?, ?, ?, 0)", (model, file, dim)
+            )
+            info = (file, dim, 0)
+        file, stored_dim, rows = info
+        if stored_dim != dim:
+            raise ValueError(f"Embedding dimension changed for {model}: {stored_dim} -> {dim}")
+
+        slots = [
+            row[0] for row in self._db.execute(
+                "SELECT slot FROM free_slots WHERE model = ? LIMIT ?", (model, count)
+            )
+        ]
+        self._db.executemany(
+            "DELETE FROM free_slots WHERE model = ? AND slot = ?", [(model, s) for s in slots]
+        )
+
+        capacity = self._capacity(dim)
+        missing = count - len(slots)
+        if missing > 0 and rows < capacity:
+            new_rows = min(capacity, max(rows + missing, rows + _GROW_ROWS))
+            with open(self._dir / file, "ab") as handle:
+                handle.truncate(new_rows * dim * 4)
+            self._db.execute("UPDATE arrays SET rows = ? WHERE model = ?", (new_rows, model))
+            grown = list(range(rows, new_rows))
+            slots += grown[:missing]
+            self._db.executemany(
+                "INSERT INTO free_slots (model, slot) VALUES (?, ?)",
+                [(model, s) for s in grown[missing:]],
+            )
+            missing = count - len(slots)
+
+        if missing > 0:
+            evict = max(missing, int(capacity * _EVICT_FRACTION))
+            victims = self._db.execute(
+                "SELECT digest, slot FROM entries WHERE model = ? ORDER BY last_used LIMIT ?",
+                (model, evict),
+            ).fetchall()
+            self._db.executemany(
+                "DELETE FROM entries WHERE model = ? AND digest = ?", [(model, d) for d, _ in victims]
+            )
+            freed = [slot for _, slot in victims]
+            slots += freed[:missing]
+            self._db.executemany(
+                "INSERT INTO free_slots (model, slot) VALUES (?, ?)",
+                [(model, s) for s in freed[missing:]],
+            )
+            logger.info("Embedding cache evicted %d LRU vectors for %s", len(victims), model)
+        return slots[:count]
+
+    def _lookup(self, model: str, digests: Sequence[bytes]) -> Dict[bytes, Tuple[int, bytes]]:
+        """digest → (slot, checksum) for the digests stored under ``model``."""
+        found: Dict[bytes, Tuple[int, bytes]] = {}
+        for start in range(0, len(digests), 500):  # stay under SQLite's variable limit
+            part = digests[start:start + 500]
+            for digest, slot, checksum in self._db.execute(
+                "SELECT digest, slot, checksum FROM entries "
+                f"WHERE model = ? AND digest IN ({','.join('?' * len(part))})",
+                (model, *part),
+            ):
+                found[digest] = (slot, checksum)
+        return found
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        digests = [_digest(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        with self._lock:
+            info = self._array_info(model)
+            if info is None:
+                return results
+            found = self._lookup(model, digests)
+            if not found:
+                return results
+            matrix = self._matrix(model, *info)
+            verified, stale = [], []
+            for i, digest in enumerate(digests):
+                entry = found.get(digest)
+                if entry is None:
+                    continue
+                row = np.array(matrix[entry[0]])
+                if _checksum(row) == entry[1]:
+                    results[i] = row
+                    verified.append(digest)
+                else:
+                    stale.append((model, digest, *entry))
+            now = time.time()
+            self._db.executemany(
+                "UPDATE entries SET last_used = ? WHERE model = ? AND digest = ?",
+                [(now, model, d) for d in verified],
+            )
+            # The row was rewritten by another process.  Usually its eviction
+            # commit removes the entry anyway; if the writer died before
+            # committing, drop the entry here so the text can be cached again
+            # (the slot itself is not freed: another entry may own it now).
+            self._db.executemany(
+                "DELETE FROM entries WHERE model = ? AND digest = ? AND slot = ? AND checksum = ?", stale
+            )
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        dim = array.shape[1]
+        row_of: Dict[bytes, int] = {}
+        for i, text in enumerate(texts):
+            row_of.setdefault(_digest(text), i)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                known = self._lookup(model, list(row_of))
+                fresh = [d for d in row_of if d not in known]
+                slots = self._allocate(model, dim, len(fresh))
+                matrix = self._matrix(model, *self._array_info(model))
+                now = time.time()
+                for digest, slot in zip(fresh, slots):
+                    matrix[slot] = array[row_of[digest]]
+                matrix.flush()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (model, digest, slot, checksum, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(model, d, s, _checksum(matrix[s]), now) for d, s in zip(fresh, slots)],
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps a LangChain embeddings object with an EmbeddingCache.  Documents are
+    cached under ``doc_namespace`` and queries under "query"; each namespace
+    has its own matrix, so one kind of text cannot evict the other.
+    """
+
+    def __init__(self, inner, model: str, cache: EmbeddingCache, doc_namespace: str = "doc") -> None:
+        self._inner = inner
+        self._model = model
+        self._cache = cache
+        self._doc_namespace = doc_namespace
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def for_namespace(self, doc_namespace: str) -> "CachedEmbeddings":
+        """The same model and cache, with documents kept under ``doc_namespace``."""
+        return CachedEmbeddings(self._inner, self._model, self._cache, doc_namespace)
+
+    @property
+    def uncached(self):
+        """The wrapped embeddings, for calls that must reach the backend (e.g. warm-up)."""
+        return self._inner
+
+    def _lookup(self, key: str, texts: List[str]) -> Tuple[list, List[int]]:
+        try:
+            cached = self._cache.get_many(key, texts)
+        except Exception as exc:  # a broken cache must never break embedding
+            logger.warning("Embedding cache read failed: %s", exc)
+            cached = [None] * len(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return cached, missing
+
+    def _store(self, key: str, texts: List[str], cached: list, missing: List[int], computed) -> np.ndarray:
+        """Cache the computed vectors; returns every text's vector as one float32 matrix."""
+        computed = np.asarray(computed, dtype=np.float32)
+        if len(missing) == len(texts):
+            result = computed
+        else:
+            dim = computed.shape[1] if missing else len(cached[0])
+            result = np.empty((len(texts), dim), dtype=np.float32)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    result[i] = vector
+            if missing:
+                result[missing] = computed
+        if missing:
+            try:
+                self._cache.put_many(key, [texts[i] for i in missing], computed)
+            except Exception as exc:
+                logger.warning("Embedding cache write failed: %s", exc)
+        return result
+
+    def _embed(self, namespace: str, texts: List[str], compute) -> np.ndarray:
+        key = f"{self._model}:{namespace}"
+        cached, missing = self._lookup(key, texts)
+        computed = compute([texts[i] for i in missing]) if missing else []
+        return self._store(key, texts, cached, missing, computed)
+
+    async def _aembed(self, namespace: str, texts: List[str], compute) -> np.ndarray:
+        # SQLite reads/writes (the write may wait on another process's lock)
+        # and the memmap flush stay off the event loop.
+        key = f"{self._model}:{namespace}"
+        cached, missing = await asyncio.to_thread(self._lookup, key, texts)
+        computed = await compute([texts[i] for i in missing]) if missing else []
+        return await asyncio.to_thread(self._store, key, texts, cached, missing, computed)
+
+    def embed_documents_array(self, texts: Sequence[str]) -> np.ndarray:
+        return self._embed(self._doc_namespace, list(texts), lambda batch: embed_documents_array(self._inner, batch))
+
+    # LangChain interface: the only place cached vectors become lists.
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text], lambda batch: [self._inner.embed_query(batch[0])])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return (await self._aembed(self._doc_namespace, texts, self._inner.aembed_documents)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async def _one(batch: List[str]) -> List[List[float]]:
+            return [await self._inner.aembed_query(batch[0])]
+
+        return (await self._aembed("query", [text], _one))[0].tolist()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache, or None when disabled via EMBED_CACHE_ENABLED=0."""
+    global _cache
+    if os.environ.get("EMBED_CACHE_ENABLED", "1").strip().lower() in ("0", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            default_dir = Path(__file__).resolve().parent.parent / ".embedding_cache"
+            directory = os.environ.get("EMBED_CACHE_DIR", "").strip() or default_dir
+            max_mb = int(os.environ.get("EMBED_CACHE_MAX_MB", "512"))
+            _cache = EmbeddingCache(directory, max_mb * 1024 * 1024)
+        return _cache
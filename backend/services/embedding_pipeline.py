@@ -0,0 +1,222 @@
+"""
+embedding_pipeline.py — concurrent, adaptively batched embed → upsert pipeline.
+
+Chunks are grouped into batches and embedded with up to ``max_in_flight``
+requests outstanding at once; across every pipeline in the process (one per
+ingestion job) at most ``EMBED_MAX_IN_FLIGHT_TOTAL`` requests run together,
+so parallel jobs share the embedding backend instead of multiplying its load.
+Finished batches are handed to a single upsert
+thread, so Qdrant writes overlap with the next embedding requests.  At most
+``2 * max_in_flight`` batches wait for that thread; beyond that the driver
+blocks and no new embedding requests start, so a slow vector store cannot
+make embedded batches pile up in memory.
+
+The batch size adapts to observed latency: quick batches grow it, slow ones
+shrink it, keeping each request near ``target_latency_s``.  A batch that fails
+is retried chunk by chunk, so one bad chunk cannot sink its neighbours.
+
+Configuration (env):
+  EMBED_BATCH_SIZE        initial chunks per embedding request (default 32)
+  EMBED_MAX_BATCH_SIZE    upper bound for adaptive growth (default 256)
+  EMBED_MAX_IN_FLIGHT     concurrent embedding requests per pipeline (default 4)
+  EMBED_MAX_IN_FLIGHT_TOTAL  concurrent embedding requests per process (default 8)
+  EMBED_TARGET_LATENCY_S  latency the batch size steers towards (default 2.0)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+logger = logging.getLogger(__name__)
+
+Vectors = Sequence[Sequence[float]]  # a float32 (n, dim) array, or lists from LangChain
+EmbedFn = Callable[[List[str]], Vectors]
+UpsertFn = Callable[[list, Vectors], None]
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+_shared_slots: Optional[threading.BoundedSemaphore] = None
+_shared_slots_lock = threading.Lock()
+
+
+def _embed_slots() -> threading.BoundedSemaphore:
+    """Process-wide budget of embedding requests shared by every pipeline."""
+    global _shared_slots
+    with _shared_slots_lock:
+        if _shared_slots is None:
+            _shared_slots = threading.BoundedSemaphore(max(1, _env_number("EMBED_MAX_IN_FLIGHT_TOTAL", 8)))
+        return _shared_slots
+
+
+@dataclass
+class IngestStats:
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_failed: int = 0
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
+    chunks_near_duplicate: int = 0
+    boilerplate_lines_removed: int = 0
+    batches: int = 0
+    elapsed_s: float = 0.0
+    final_batch_size: int = 0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks_upserted / self.elapsed_s if self.elapsed_s else 0.0
+
+
+@dataclass
+class AdaptiveBatchSize:
+    """Multiplicative increase / decrease of the batch size around a latency target."""
+
+    size: int
+    minimum: int = 1
+    maximum: int = 256
+    target_latency_s: float = 2.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def observe(self, batch_len: int, latency_s: float) -> None:
+        with self._lock:
+            if batch_len < self.size:
+                return  # a short tail batch says nothing about capacity
+            if latency_s < self.target_latency_s / 2:
+                self.size = min(self.maximum, self.size * 2)
+            elif latency_s > self.target_latency_s:
+                self.size = max(self.minimum, self.size // 2)
+
+    def current(self) -> int:
+        with self._lock:
+            return self.size
+
+
+class EmbeddingPipeline:
+    def __init__(
+        self,
+        embed: EmbedFn,
+        upsert: UpsertFn,
+        batch_size: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        target_latency_s: Optional[float] = None,
+        on_progress: Optional[Callable[[IngestStats], None]] = None,
+    ) -> None:
+        self._embed = embed
+        self._upsert = upsert
+        self._max_in_flight = max_in_flight or _env_number("EMBED_MAX_IN_FLIGHT", 4)
+        self._batch = AdaptiveBatchSize(
+            size=batch_size or _env_number("EMBED_BATCH_SIZE", 32),
+            maximum=max_batch_size or _env_number("EMBED_MAX_BATCH_SIZE", 256),
+            target_latency_s=target_latency_s or _env_number("EMBED_TARGET_LATENCY_S", 2.0, float),
+        )
+        self._on_progress = on_progress
+        self.stats = IngestStats()
+
+    # ── Stages ────────────────────────────────────────────────────────────────
+
+    def _batches(self, chunks: Iterable) -> Iterator[list]:
+        batch: list = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self._batch.current():
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _embed_batch(self, batch: list) -> tuple[list, Vectors]:
+        texts = [chunk.page_content for chunk in batch]
+        try:
+            with _embed_slots():
+                # Timed inside the slot: waiting for other jobs is not backend latency.
+                started = time.perf_counter()
+                vectors = self._embed(texts)
+            self._batch.observe(len(batch), time.perf_counter() - started)
+            return batch, vectors
+        except Exception as exc:
+            logger.warning("Embedding batch of %d failed (%s); retrying chunk by chunk", len(batch), exc)
+            self._batch.observe(len(batch), float("inf"))
+
+        kept, vectors = [], []
+        for chunk in batch:
+            try:
+                with _embed_slots():
+                    vectors.extend(self._embed([chunk.page_content]))
+                kept.append(chunk)
+            except Exception as exc:
+                logger.warning("Dropping chunk that failed to embed: %s", exc)
+        return kept, vectors
+
+    def _progress(self) -> None:
+        if self._on_progress is not None:
+            self._on_progress(self.stats)
+
+    def _do_upsert(self, batch: list, vectors: Vectors) -> None:
+        self._upsert(batch, vectors)
+        self.stats.chunks_upserted += len(batch)
+        self._progress()
+
+    # ── Driver ────────────────────────────────────────────────────────────────
+
+    def run(self, chunks: Iterable) -> IngestStats:
+        started = time.perf_counter()
+        submitted = 0
+        in_flight: Dict[Future, int] = {}  # embedding future -> batch length
+        upserts: Set[Future] = set()  # pending writes
+        max_pending = 2 * self._max_in_flight
+
+        with ThreadPoolExecutor(self._max_in_flight, thread_name_prefix="embed") as embedders, \
+                ThreadPoolExecutor(1, thread_name_prefix="upsert") as writer:
+
+            def _reap(limit: int) -> None:
+                """Wait until fewer than ``limit`` writes are pending."""
+                while upserts:
+                    for future in [f for f in upserts if f.done()]:
+                        upserts.discard(future)
+                        future.result()  # fail fast if Qdrant rejected a write
+                    if len(upserts) < limit:
+                        return
+                    wait(upserts, return_when=FIRST_COMPLETED)
+
+            def _drain(return_when: str) -> None:
+                done, _ = wait(in_flight, return_when=return_when)
+                for future in done:
+                    batch, vectors = future.result()
+                    self.stats.batches += 1
+                    self.stats.chunks_embedded += len(batch)
+                    self.stats.chunks_failed += in_flight.pop(future) - len(batch)
+                    if batch:
+                        _reap(max_pending)
+                        upserts.add(writer.submit(self._do_upsert, batch, vectors))
+                _reap(max_pending)
+
+            for batch in self._batches(chunks):
+                in_flight[embedders.submit(self._embed_batch, batch)] = len(batch)
+                submitted += len(batch)
+                if len(in_flight) >= self._max_in_flight:
+                    _drain(FIRST_COMPLETED)
+            if in_flight:
+                _drain(ALL_COMPLETED)
+            _reap(1)
+
+        self.stats.elapsed_s = time.perf_counter() - started
+        self.stats.final_batch_size = self._batch.current()
+        logger.info(
+            "Embedded %d/%d chunks in %.1fs (%.1f chunks/s, final batch size %d, %d failed)",
+            self.stats.chunks_upserted, submitted, self.stats.elapsed_s,
+            self.stats.chunks_per_s, self.stats.final_batch_size, self.stats.chunks_failed,
+        )
+        return self.stats
+
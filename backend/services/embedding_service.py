@@ -0,0 +1,205 @@
+"""
+embedding_service.py — pluggable embedding backends for PDF RAG.
+
+Every backend is a LangChain ``Embeddings`` (embed_documents / embed_query),
+so the embedding cache and pipeline wrap any of them unchanged.  Backends that
+compute a float32 matrix anyway (OnnxEmbeddings, CachedEmbeddings) also offer
+``embed_documents_array``; ingestion and compression go through
+embed_documents_array() below and keep that matrix, so vectors only become
+Python lists at the LangChain boundary.
+
+  ollama  OllamaEmbeddings over HTTP (default)
+  onnx    OnnxEmbeddings: a sentence-embedding model run in-process on the CPU
+          with ONNX Runtime; no separate server and no JSON-encoded floats
+
+The ONNX backend expects a directory holding ``model.onnx`` and the Hugging
+Face ``tokenizer.json`` (e.g. an Optimum export) and needs the optional
+``onnxruntime`` and ``tokenizers`` packages.  Texts are sorted by length and
+packed into batches under a padded-token budget, so short chunks are not
+padded to the length of long ones.
+
+Configuration:
+  EMBED_BACKEND                ollama | onnx (default ollama)
+  EMBED_ONNX_MODEL_DIR         directory with model.onnx + tokenizer.json
+  EMBED_ONNX_THREADS           intra-op threads (default 0 = ONNX Runtime picks)
+  EMBED_ONNX_MAX_LENGTH        truncation length in tokens (default 512)
+  EMBED_ONNX_MAX_BATCH_TOKENS  padded tokens per inference call (default 16384)
+  EMBED_ONNX_DOC_PREFIX        prepended to documents, e.g. "search_document: "
+  EMBED_ONNX_QUERY_PREFIX      prepended to queries, e.g. "search_query: "
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def _env(name: str, default: str = "") -> str:
+    return os.environ.get(name, default)
+
+
+def embedding_backend() -> str:
+    backend = _env("EMBED_BACKEND", "ollama").strip().lower()
+    if backend not in ("ollama", "onnx"):
+        raise ValueError(f"Unsupported EMBED_BACKEND: {backend!r}")
+    return backend
+
+
+def embedding_model_key() -> str:
+    """
+    Identifies the backend + model, for the embedding cache, point ids and the
+    dimension memo.  For ONNX it covers the model file itself (resolved path,
+    size and mtime, so two ``model`` directories or a re-exported model never
+    share vectors) and both prefixes, which change every vector.
+    """
+    if embedding_backend() == "onnx":
+        model_dir = Path(_env("EMBED_ONNX_MODEL_DIR", "")).resolve()
+        model_file = model_dir / "model.onnx"
+        try:
+            stat = model_file.stat()
+            version = f"{stat.st_size}:{stat.st_mtime_ns}"
+        except OSError:
+            version = "missing"
+        identity = "\0".join((
+            str(model_file), version,
+            _env("EMBED_ONNX_DOC_PREFIX", ""), _env("EMBED_ONNX_QUERY_PREFIX", ""),
+        ))
+        return f"onnx/{model_dir.name}-{hashlib.sha1(identity.encode('utf-8')).hexdigest()[:12]}"
+    return f"ollama/{_env('OLLAMA_EMBED_MODEL', 'nomic-embed-text-v2-moe')}"
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(
+        self,
+        model_dir: str | os.PathLike,
+        threads: int = 0,
+        max_length: int = 512,
+        max_batch_tokens: int = 16384,
+        doc_prefix: str = "",
+        query_prefix: str = "",
+    ) -> None:
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as exc:
+            raise RuntimeError(
+                "EMBED_BACKEND=onnx needs the optional packages: pip install onnxruntime tokenizers"
+            ) from exc
+
+        model_dir = Path(model_dir)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(
+            str(model_dir / "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._output_names = [o.name for o in self._session.get_outputs()]
+
+        self._tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length)
+        self._tokenizer.no_padding()  # padded per batch below
+        self._max_batch_tokens = max_batch_tokens
+        self._doc_prefix = doc_prefix
+        self._query_prefix = query_prefix
+        self._lock = threading.Lock()  # tokenizers' encode_batch is not re-entrant
+        logger.info("Loaded ONNX embedding model from %s", model_dir)
+
+    def _batches(self, lengths: Sequence[int]) -> List[List[int]]:
+        """Indices grouped so each batch's padded size stays under the token budget."""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        for index in order:
+            # Sorted ascending, so this text sets the batch's padded length.
+            if current and (len(current) + 1) * lengths[index] > self._max_batch_tokens:
+                batches.append(current)
+                current = []
+            current.append(index)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _infer(self, encodings: list) -> np.ndarray:
+        width = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(encodings), width), dtype=np.int64)
+        mask = np.zeros_like(ids)
+        for row, encoding in enumerate(encodings):
+            ids[row, :len(encoding.ids)] = encoding.ids
+            mask[row, :len(encoding.ids)] = 1
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        outputs = dict(zip(self._output_names, self._session.run(None, feeds)))
+
+        if "sentence_embedding" in outputs:
+            pooled = outputs["sentence_embedding"]
+        else:
+            hidden = outputs[self._output_names[0]]
+            weights = mask[..., np.newaxis].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        pooled = pooled.astype(np.float32, copy=False)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def embed_array(self, texts: Sequence[str], prefix: str = "") -> np.ndarray:
+        """Embeddings as one float32 (len(texts), dim) array, in input order."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            encodings = self._tokenizer.encode_batch([prefix + text for text in texts])
+        result: np.ndarray | None = None
+        for batch in self._batches([len(e.ids) for e in encodings]):
+            vectors = self._infer([encodings[i] for i in batch])
+            if result is None:
+                result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[batch] = vectors
+        return result
+
+    def embed_documents_array(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embed_array(texts, self._doc_prefix)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text], self._query_prefix)[0].tolist()
+
+
+def embed_documents_array(embeddings: Embeddings, texts: Sequence[str]) -> np.ndarray:
+    """Document vectors as one float32 (len(texts), dim) array, from any backend."""
+    native = getattr(embeddings, "embed_documents_array", None)
+    if native is not None:
+        return native(texts)
+    return np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
+
+
+def create_embeddings() -> Embeddings:
+    """A new, uncached instance of the configured backend."""
+    if embedding_backend() == "onnx":
+        model_dir = _env("EMBED_ONNX_MODEL_DIR", "").strip()
+        if not model_dir:
+            raise RuntimeError("EMBED_ONNX_MODEL_DIR is not set in environment")
+        return OnnxEmbeddings(
+            model_dir,
+            threads=int(_env("EMBED_ONNX_THREADS", "0")),
+            max_length=int(_env("EMBED_ONNX_MAX_LENGTH", "512")),
+            max_batch_tokens=int(_env("EMBED_ONNX_MAX_BATCH_TOKENS", "16384")),
+            doc_prefix=_env("EMBED_ONNX_DOC_PREFIX", ""),
+            query_prefix=_env("EMBED_ONNX_QUERY_PREFIX", ""),
+        )
+
+    from langchain_ollama import OllamaEmbeddings
+
+    return OllamaEmbeddings(
+        model=_env("OLLAMA_EMBED_MODEL", "nomic-embed-text-v2-moe"),
+        base_url=_env("OLLAMA_BASE_URL", "http://localhost:11434"),
+    )
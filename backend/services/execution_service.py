@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import ast
 import os
+import re
 import subprocess
 import sys
 import tempfile
-from typing import Dict
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-from backend.models.schemas import RunResult
+from backend.models.schemas import BatchCaseResult, RunCase, RunResult
 
 _BANNED_MODULES: frozenset[str] = frozenset({
     "os", "pathlib", "shutil", "subprocess", "sys", "socket",
@@ -27,66 +31,185 @@ def _safe_env() -> Dict[str, str]:
     }
 
 
-def _contains_disallowed_tokens(code: str) -> bool:
-    """Use AST parsing to detect disallowed imports and built-in calls."""
-    try:
-        tree = ast.parse(code)
-    except SyntaxError:
-        # Unparseable code — block it to be safe
-        return True
+def describe_disallowed_usage(code: str) -> Optional[str]:
+    """Return a short description of the first sandbox violation, or None."""
+    tree = ast.parse(code)
 
     for node in ast.walk(tree):
         # import os / import sys / import subprocess …
         if isinstance(node, ast.Import):
             for alias in node.names:
                 if alias.name.split(".")[0] in _BANNED_MODULES:
-                    return True
+                    return f"line {node.lineno}: imports banned module '{alias.name}'"
 
         # from os import path / from subprocess import run …
         elif isinstance(node, ast.ImportFrom):
             if node.module and node.module.split(".")[0] in _BANNED_MODULES:
-                return True
+                return f"line {node.lineno}: imports from banned module '{node.module}'"
 
         # open(...) / __import__(...) / eval(...) / exec(...) …
         elif isinstance(node, ast.Call):
             if isinstance(node.func, ast.Name) and node.func.id in _BANNED_BUILTINS:
-                return True
+                return f"line {node.lineno}: calls banned builtin '{node.func.id}()'"
 
-    return False
+    return None
 
 
-def run_python(code: str, timeout_seconds: int = 5) -> RunResult:
-    if _contains_disallowed_tokens(code):
+def _contains_disallowed_tokens(code: str) -> bool:
+    """Use AST parsing to detect disallowed imports and built-in calls."""
+    try:
+        return describe_disallowed_usage(code) is not None
+    except SyntaxError:
+        # Unparseable code — block it to be safe
+        return True
+
+
+def validate_python(code: str) -> Optional[str]:
+    """Statically check code the way the sandbox will; None means it is runnable."""
+    try:
+        compile(code, "main.py", "exec")
+    except SyntaxError as exc:
+        return f"line {exc.lineno}: {type(exc).__name__}: {exc.msg}"
+    except ValueError as exc:  # e.g. null bytes in source
+        return str(exc)
+    return describe_disallowed_usage(code)
+
+
+def _blocked_result() -> RunResult:
+    return RunResult(
+        stdout="",
+        stderr="File system or process access is not allowed in this sandbox.",
+        exit_code=1,
+        timed_out=False,
+    )
+
+
+def _precheck(code: str) -> Optional[RunResult]:
+    """Return the result for code that must not be executed, else None."""
+    try:
+        ast.parse(code, filename="main.py")
+    except SyntaxError as exc:
+        # Report the real syntax error instead of the generic sandbox refusal.
         return RunResult(
             stdout="",
-            stderr="File system or process access is not allowed in this sandbox.",
+            stderr="".join(traceback.format_exception_only(type(exc), exc)),
             exit_code=1,
             timed_out=False,
         )
+    if _contains_disallowed_tokens(code):
+        return _blocked_result()
+    return None
+
+
+def trim_traceback(stderr: str, max_frames: int = 3) -> str:
+    """Reduce a traceback to the user's own frames plus the final exception.
+
+    Library frames are dropped, only the innermost ``max_frames`` frames from
+    main.py are kept and sandbox temp paths are shortened to ``main.py``.
+    """
+    stderr = re.sub(r'File "[^"]*main\.py"', 'File "main.py"', stderr)
+    marker = "Traceback (most recent call last):"
+    if marker not in stderr:
+        return stderr.strip()
+
+    lines = stderr[stderr.rindex(marker):].splitlines()[1:]
+    frames: List[List[str]] = []
+    tail: List[str] = []
+    for line in lines:
+        if line.startswith("  File "):
+            frames.append([line])
+        elif line.startswith(" ") and frames and not tail:
+            frames[-1].append(line)
+        else:
+            tail.append(line)
+
+    user_frames = [frame for frame in frames if frame[0].startswith('  File "main.py"')]
+    kept = user_frames[-max_frames:] or frames[-1:]
+    body = [line for frame in kept for line in frame]
+    return "\n".join([marker, *body, *tail]).strip()
+
+
+def stdin_exhausted(result: RunResult) -> bool:
+    """True when a run failed only because the script read past its stdin.
+
+    Pre-runs feed empty stdin, so ``input()`` raises EOFError on correct code;
+    such a result says nothing about whether the code is buggy.
+    """
+    if result.exit_code == 0 or result.timed_out:
+        return False
+    lines = [line for line in result.stderr.strip().splitlines() if line.strip()]
+    return bool(lines) and lines[-1].startswith("EOFError")
+
+
+def _execute_file(file_path: str, cwd: str, timeout_seconds: int, stdin: str = "") -> RunResult:
+    try:
+        completed = subprocess.run(
+            [sys.executable, file_path],
+            cwd=cwd,
+            env=_safe_env(),
+            input=stdin,
+            capture_output=True,
+            text=True,
+            timeout=timeout_seconds,
+        )
+        return RunResult(
+            stdout=completed.stdout,
+            stderr=completed.stderr,
+            exit_code=completed.returncode,
+            timed_out=False,
+        )
+    except subprocess.TimeoutExpired as exc:
+        return RunResult(
+            stdout=exc.stdout or "",
+            stderr=exc.stderr or "Execution timed out.",
+            exit_code=124,
+            timed_out=True,
+        )
+
+
+def run_python(code: str, timeout_seconds: int = 5) -> RunResult:
+    rejected = _precheck(code)
+    if rejected is not None:
+        return rejected
     with tempfile.TemporaryDirectory(prefix="voiceforge_") as temp_dir:
         file_path = os.path.join(temp_dir, "main.py")
         with open(file_path, "w", encoding="utf-8") as handle:
             handle.write(code)
+        return _execute_file(file_path, temp_dir, timeout_seconds)
+
+
+def run_python_batch(
+    code: str,
+    cases: List[RunCase],
+    timeout_seconds: int = 5,
+    max_workers: Optional[int] = None,
+) -> List[BatchCaseResult]:
+    """Run one script against many stdin cases, fanned out across a worker pool.
+
+    The code is validated and written once; every case then gets its own
+    interpreter with its own timeout, so one hanging case cannot starve the rest.
+    """
+    rejected = _precheck(code)
+    if rejected is not None:
+        return [
+            BatchCaseResult(index=i, result=rejected, duration_ms=0.0)
+            for i in range(len(cases))
+        ]
+
+    workers = max_workers or int(os.environ.get("RUN_BATCH_WORKERS", 0)) or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="voiceforge_") as temp_dir:
+        file_path = os.path.join(temp_dir, "main.py")
+        with open(file_path, "w", encoding="utf-8") as handle:
+            handle.write(code)
+
+        def _run_case(index: int) -> BatchCaseResult:
+            # Each case gets a private cwd so cases cannot see each other's files.
+            with tempfile.TemporaryDirectory(dir=temp_dir) as case_dir:
+                started = time.perf_counter()
+                result = _execute_file(file_path, case_dir, timeout_seconds, cases[index].stdin)
+                elapsed = (time.perf_counter() - started) * 1000
+            return BatchCaseResult(index=index, result=result, duration_ms=round(elapsed, 2))
 
-        try:
-            completed = subprocess.run(
-                [sys.executable, file_path],
-                cwd=temp_dir,
-                env=_safe_env(),
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds,
-            )
-            return RunResult(
-                stdout=completed.stdout,
-                stderr=completed.stderr,
-                exit_code=completed.returncode,
-                timed_out=False,
-            )
-        except subprocess.TimeoutExpired as exc:
-            return RunResult(
-                stdout=exc.stdout or "",
-                stderr=exc.stderr or "Execution timed out.",
-                exit_code=124,
-                timed_out=True,
-            )
+        with ThreadPoolExecutor(max_workers=min(workers, max(len(cases), 1))) as pool:
+            return list(pool.map(_run_case, range(len(cases))))
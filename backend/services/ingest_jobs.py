@@ -0,0 +1,252 @@
+"""
+ingest_jobs.py — in-process background queue for learn-book PDF ingestion.
+
+Uploads are spooled to disk and indexed by a bounded pool of worker threads,
+so the HTTP request returns immediately and the event loop is never blocked
+by parsing or embedding.  Each job keeps live progress counters (pages parsed,
+chunks embedded, chunks upserted) for the status endpoint.
+
+A book may have several documents (learn_book_documents rows); each is its
+own job, so a textbook and its handouts are indexed in parallel by the same
+worker pool, and the embedding pipeline caps embedding requests across all
+running jobs (EMBED_MAX_IN_FLIGHT_TOTAL).
+
+Job state is mirrored to ``<spool>/<job_id>.json`` next to the spooled PDF.
+On startup ``recover()`` re-queues every job that was queued or running when
+the previous process stopped.
+
+Configuration:
+  INGEST_WORKERS    concurrent ingestion jobs (default 2)
+  INGEST_SPOOL_DIR  spool directory (default backend/.ingest_spool)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from backend.db.supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Finished job records older than this are pruned from the spool on startup.
+_FINISHED_TTL_SECONDS = 24 * 3600
+# Minimum interval between progress writes to the spool.
+_PERSIST_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    book_id: str
+    user_id: str
+    collection_name: str
+    source: str
+    document_id: Optional[str] = None
+    status: str = QUEUED
+    pages_parsed: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_failed: int = 0
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
+    chunks_near_duplicate: int = 0
+    boilerplate_lines_removed: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+
+def _mark_book_indexed(job: IngestJob) -> None:
+    """Flip has_pdf only once every chunk is in the vector store."""
+    client = get_supabase_client()
+    client.table("learn_books").update(
+        {"has_pdf": True, "pdf_collection_name": job.collection_name}
+    ).eq("id", job.book_id).eq("user_id", job.user_id).execute()
+
+
+def _update_document(job: IngestJob, **changes) -> None:
+    """Mirror job progress onto the learn_book_documents row, if the job has one."""
+    if job.document_id is None:
+        return
+    try:
+        get_supabase_client().table("learn_book_documents").update(changes).eq(
+            "id", job.document_id
+        ).eq("user_id", job.user_id).execute()
+    except Exception as exc:
+        logger.warning("Could not update document %s: %s", job.document_id, exc)
+
+
+class IngestQueue:
+    def __init__(self, spool_dir: Path, workers: int) -> None:
+        self._spool = spool_dir
+        self._spool.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+        self._last_persist: Dict[str, float] = {}
+
+    # ── Spool ─────────────────────────────────────────────────────────────────
+
+    def _pdf_path(self, job_id: str) -> Path:
+        return self._spool / f"{job_id}.pdf"
+
+    def _state_path(self, job_id: str) -> Path:
+        return self._spool / f"{job_id}.json"
+
+    def _persist(self, job: IngestJob, force: bool = True) -> None:
+        now = time.time()
+        if not force and now - self._last_persist.get(job.job_id, 0.0) < _PERSIST_INTERVAL_SECONDS:
+            return
+        self._last_persist[job.job_id] = now
+        tmp = self._state_path(job.job_id).with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(job)), encoding="utf-8")
+        os.replace(tmp, self._state_path(job.job_id))
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def submit(
+        self,
+        book_id: str,
+        user_id: str,
+        collection_name: str,
+        source: str,
+        pdf_bytes: bytes,
+        document_id: Optional[str] = None,
+    ) -> IngestJob:
+        job = IngestJob(
+            job_id=uuid.uuid4().hex,
+            book_id=book_id,
+            user_id=user_id,
+            collection_name=collection_name,
+            source=source,
+            document_id=document_id,
+        )
+        self._pdf_path(job.job_id).write_bytes(pdf_bytes)
+        self._persist(job)
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def recover(self) -> int:
+        """Re-queue jobs interrupted by a restart; prune stale finished records."""
+        recovered = 0
+        now = time.time()
+        for state_path in self._spool.glob("*.json"):
+            try:
+                job = IngestJob(**json.loads(state_path.read_text(encoding="utf-8")))
+            except Exception as exc:
+                logger.warning("Skipping unreadable ingest job %s: %s", state_path.name, exc)
+                continue
+
+            if job.status in (COMPLETED, FAILED):
+                if now - job.updated_at > _FINISHED_TTL_SECONDS:
+                    state_path.unlink(missing_ok=True)
+                else:
+                    with self._lock:
+                        self._jobs[job.job_id] = job
+                continue
+
+            if not self._pdf_path(job.job_id).exists():
+                job.status, job.error = FAILED, "Spooled PDF missing after restart"
+                self._persist(job)
+                _update_document(job, status=FAILED, error=job.error)
+                continue
+
+            logger.info("Recovering interrupted ingest job %s for book %s", job.job_id, job.book_id)
+            job.status = QUEUED
+            job.pages_parsed = job.chunks_embedded = job.chunks_upserted = job.chunks_failed = 0
+            job.chunks_unchanged = job.chunks_deleted = 0
+            job.chunks_near_duplicate = job.boilerplate_lines_removed = 0
+            self._persist(job)
+            self._enqueue(job)
+            recovered += 1
+        return recovered
+
+    # ── Worker ────────────────────────────────────────────────────────────────
+
+    def _enqueue(self, job: IngestJob) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job)
+
+    def _run(self, job: IngestJob) -> None:
+        from backend.services.rag_service import index_pdf
+
+        job.status = RUNNING
+        job.updated_at = time.time()
+        self._persist(job)
+        _update_document(job, status=RUNNING, error=None)
+
+        def _on_progress(stats) -> None:
+            job.pages_parsed = stats.pages_parsed
+            job.chunks_embedded = stats.chunks_embedded
+            job.chunks_upserted = stats.chunks_upserted
+            job.chunks_failed = stats.chunks_failed
+            job.chunks_unchanged = stats.chunks_unchanged
+            job.chunks_deleted = stats.chunks_deleted
+            job.chunks_near_duplicate = stats.chunks_near_duplicate
+            job.boilerplate_lines_removed = stats.boilerplate_lines_removed
+            job.updated_at = time.time()
+            self._persist(job, force=False)
+
+        try:
+            pdf_bytes = self._pdf_path(job.job_id).read_bytes()
+            stats = index_pdf(
+                pdf_bytes, job.collection_name, job.source,
+                on_progress=_on_progress, document_id=job.document_id,
+            )
+            _on_progress(stats)
+            _mark_book_indexed(job)
+            job.status = COMPLETED
+            _update_document(
+                job,
+                status=COMPLETED,
+                pages=stats.pages_parsed,
+                chunks=stats.chunks_upserted + stats.chunks_unchanged,
+            )
+            logger.info(
+                "Ingest job %s completed | pages=%d | new=%d | unchanged=%d | deleted=%d",
+                job.job_id, job.pages_parsed, job.chunks_upserted,
+                job.chunks_unchanged, job.chunks_deleted,
+            )
+        except Exception as exc:
+            logger.error("Ingest job %s failed: %s", job.job_id, exc, exc_info=True)
+            job.status = FAILED
+            job.error = str(exc)
+            _update_document(job, status=FAILED, error=job.error)
+        finally:
+            job.updated_at = time.time()
+            self._persist(job)
+            self._last_persist.pop(job.job_id, None)
+            self._pdf_path(job.job_id).unlink(missing_ok=True)
+
+
+_queue: Optional[IngestQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            default_dir = Path(__file__).resolve().parent.parent / ".ingest_spool"
+            spool_dir = Path(os.environ.get("INGEST_SPOOL_DIR", "").strip() or default_dir)
+            workers = max(1, int(os.environ.get("INGEST_WORKERS", "2")))
+            _queue = IngestQueue(spool_dir, workers)
+        return _queue
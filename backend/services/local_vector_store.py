@@ -0,0 +1,233 @@
+"""
+local_vector_store.py — in-process vector index for small learn books.
+
+One directory per book collection:
+  meta.json             {"dim", "count", "payload_bytes", "version"}; written last, atomically
+  vectors-<v>.f32       row-major float32 matrix of L2-normalised vectors (memory-mapped)
+  payloads-<v>.jsonl    one {"id", "payload"} line per row, same order
+
+Search is a brute-force dot product over the memory-mapped matrix followed by
+an argpartition top-k, which for a few hundred vectors takes microseconds and
+needs no Qdrant round trip.
+
+Upserts append rows and then bump ``count`` in meta.json, so readers never see
+a half-written row; a reader that already holds the rows only parses the new
+ones.  Deletes rewrite the files under a new version number and swap
+meta.json.  The previous version's files are kept until the next version is
+published, so a search in another process (the LiveKit agent) that read the
+old meta.json can still open them; a reader that loses that race re-reads
+meta.json once.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(directory: Path) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(str(directory), threading.Lock())
+
+
+def _normalized(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+@dataclass
+class _Loaded:
+    """Rows of one version read so far; grows in place as upserts append."""
+
+    version: int
+    count: int = 0
+    payload_bytes: int = 0
+    matrix: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.float32))
+    ids: List[str] = field(default_factory=list)
+    payloads: List[dict] = field(default_factory=list)
+    id_set: Set[str] = field(default_factory=set)
+
+
+class LocalVectorStore:
+    def __init__(self, directory: str | os.PathLike) -> None:
+        self._dir = Path(directory)
+        self._lock = _lock_for(self._dir)
+        self._load_lock = threading.Lock()
+        self._loaded: Optional[_Loaded] = None
+
+    # ── Files ─────────────────────────────────────────────────────────────────
+
+    def _meta_path(self) -> Path:
+        return self._dir / "meta.json"
+
+    def _vectors_path(self, version: int) -> Path:
+        return self._dir / f"vectors-{version}.f32"
+
+    def _payloads_path(self, version: int) -> Path:
+        return self._dir / f"payloads-{version}.jsonl"
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            return json.loads(self._meta_path().read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, meta: dict) -> None:
+        tmp = self._meta_path().with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self._meta_path())
+
+    def _load(self) -> _Loaded:
+        with self._load_lock:
+            try:
+                return self._refresh(self._read_meta())
+            except FileNotFoundError:
+                # Two versions were published since we read meta.json.
+                return self._refresh(self._read_meta())
+
+    def _refresh(self, meta: Optional[dict]) -> _Loaded:
+        if meta is None or meta["count"] == 0:
+            return _Loaded(version=-1)
+        loaded = self._loaded
+        if loaded is None or loaded.version != meta["version"] or loaded.count > meta["count"]:
+            loaded = _Loaded(version=meta["version"])
+        if loaded.count == meta["count"]:
+            self._loaded = loaded
+            return loaded
+
+        # Only the rows appended since the last load are parsed.  The lists
+        # grow in place: earlier callers index them by their own row count.
+        with open(self._payloads_path(meta["version"]), "rb") as handle:
+            handle.seek(loaded.payload_bytes)
+            for line in handle.read(meta["payload_bytes"] - loaded.payload_bytes).splitlines():
+                row = json.loads(line)
+                loaded.ids.append(row["id"])
+                loaded.payloads.append(row["payload"])
+                loaded.id_set.add(row["id"])
+        loaded.matrix = np.memmap(
+            self._vectors_path(meta["version"]), dtype=np.float32, mode="r", shape=(meta["count"], meta["dim"])
+        )
+        loaded.count, loaded.payload_bytes = meta["count"], meta["payload_bytes"]
+        self._loaded = loaded
+        return loaded
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def exists(self) -> bool:
+        return self._meta_path().exists()
+
+    def __len__(self) -> int:
+        meta = self._read_meta()
+        return meta["count"] if meta else 0
+
+    def ids(self) -> Set[str]:
+        return set(self._load().id_set)
+
+    def document_ids(self, document_id: Optional[str]) -> Set[str]:
+        """Ids of the rows from one document (None: rows stored without a document_id)."""
+        loaded = self._load()
+        rows = zip(loaded.ids[:loaded.count], loaded.payloads[:loaded.count])
+        return {point_id for point_id, payload in rows if payload.get("document_id") == document_id}
+
+    def upsert(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], payloads: Sequence[dict]) -> None:
+        if not ids:
+            return
+        matrix = _normalized(vectors)
+        with self._lock:
+            meta = self._read_meta()
+            if meta is not None and meta["dim"] != matrix.shape[1]:
+                # Same policy as Qdrant collections: a new embedding size starts over.
+                self.drop()
+                meta = None
+            if meta is None:
+                self._dir.mkdir(parents=True, exist_ok=True)
+                # A store dropped and re-created elsewhere must not reuse a
+                # version number that a reader may still hold rows of.
+                meta = {"dim": matrix.shape[1], "count": 0, "payload_bytes": 0, "version": time.time_ns()}
+
+            replaced = set(ids) & self._load().id_set
+            if replaced:
+                self._delete_locked(replaced)
+                meta = self._read_meta()
+
+            self._trim(meta)
+            with open(self._vectors_path(meta["version"]), "ab") as handle:
+                handle.write(matrix.tobytes())
+            lines = "".join(
+                json.dumps({"id": point_id, "payload": payload}) + "\n"
+                for point_id, payload in zip(ids, payloads)
+            ).encode("utf-8")
+            with open(self._payloads_path(meta["version"]), "ab") as handle:
+                handle.write(lines)
+            meta["count"] += len(ids)
+            meta["payload_bytes"] += len(lines)
+            self._write_meta(meta)
+
+    def _trim(self, meta: dict) -> None:
+        """Drop rows past ``count`` left behind by an interrupted upsert."""
+        with open(self._vectors_path(meta["version"]), "ab") as handle:
+            handle.truncate(meta["count"] * meta["dim"] * 4)
+        with open(self._payloads_path(meta["version"]), "ab") as handle:
+            handle.truncate(meta["payload_bytes"])
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            self._delete_locked(set(ids))
+
+    def _delete_locked(self, doomed: Set[str]) -> None:
+        meta = self._read_meta()
+        if meta is None or not doomed:
+            return
+        loaded = self._load()
+        ids, payloads = loaded.ids[:loaded.count], loaded.payloads[:loaded.count]
+        keep = [i for i, point_id in enumerate(ids) if point_id not in doomed]
+        if len(keep) == len(ids):
+            return
+
+        version = meta["version"] + 1
+        np.ascontiguousarray(loaded.matrix[keep]).tofile(self._vectors_path(version))
+        lines = "".join(
+            json.dumps({"id": ids[i], "payload": payloads[i]}) + "\n" for i in keep
+        ).encode("utf-8")
+        self._payloads_path(version).write_bytes(lines)
+        self._write_meta({"dim": meta["dim"], "count": len(keep), "payload_bytes": len(lines), "version": version})
+        # meta["version"] stays for readers that have not seen the new meta.json yet.
+        self._remove_versions_before(meta["version"])
+
+    def _remove_versions_before(self, version: int) -> None:
+        for pattern in ("vectors-*.f32", "payloads-*.jsonl"):
+            for path in self._dir.glob(pattern):
+                try:
+                    older = int(path.stem.split("-", 1)[1]) < version
+                except ValueError:
+                    continue
+                if older:
+                    path.unlink(missing_ok=True)
+
+    def search(self, vector: Sequence[float], k: int) -> List[Tuple[float, dict, np.ndarray]]:
+        """Top-k (cosine score, payload, normalised vector) triples, best first."""
+        loaded = self._load()
+        if not loaded.count:
+            return []
+        matrix, payloads = loaded.matrix, loaded.payloads
+        query = _normalized([vector])[0]
+        scores = matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), payloads[i], np.asarray(matrix[i])) for i in top]
+
+    def drop(self) -> None:
+        self._loaded = None
+        shutil.rmtree(self._dir, ignore_errors=True)
@@ -0,0 +1,135 @@
+"""
+pdf_service.py — PDF text extraction, sharded across a process pool.
+
+Text extraction is pure CPU work, so large PDFs are split into page ranges
+that are extracted in parallel worker processes.  Results are yielded page by
+page, in order, so the chunking stage downstream can start on the first shard
+while later shards are still being extracted.
+
+The PDF is written once to a temporary file and workers receive only its path;
+each worker keeps the parsed reader for the current file, so a document is
+parsed once per worker rather than once per shard.  Only a bounded window of
+shards (two per worker) is in flight at a time, so extracted text is never held
+for more than that window.
+
+Configuration:
+  PDF_EXTRACT_WORKERS      worker processes (default 1 = extract in-process)
+  PDF_EXTRACT_SHARD_PAGES  minimum pages per shard (default 16)
+"""
+from __future__ import annotations
+
+import atexit
+import io
+import logging
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PageText = Tuple[int, str]  # (0-based page index, extracted text)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+def _reader(pdf_bytes: bytes):
+    from pypdf import PdfReader
+
+    return PdfReader(io.BytesIO(pdf_bytes))
+
+
+# Per-worker cache of the reader for the file currently being extracted.
+_worker_reader: Tuple[Optional[tuple], object] = (None, None)
+
+
+def _extract_range(path: str, start: int, stop: int) -> List[PageText]:
+    """Worker entry point: extract pages [start, stop) of the PDF at ``path``."""
+    global _worker_reader
+    stat = os.stat(path)
+    key = (path, stat.st_ino, stat.st_mtime_ns)
+    cached_key, reader = _worker_reader
+    if cached_key != key:
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+        _worker_reader = (key, reader)
+    return [(index, reader.pages[index].extract_text() or "") for index in range(start, stop)]
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def page_count(pdf_bytes: bytes) -> int:
+    return len(_reader(pdf_bytes).pages)
+
+
+def extract_pages(pdf_bytes: bytes, workers: Optional[int] = None) -> Iterator[PageText]:
+    """Yield (page index, text) for every page, in page order."""
+    workers = workers or _env_int("PDF_EXTRACT_WORKERS", 1)
+    shard_pages = _env_int("PDF_EXTRACT_SHARD_PAGES", 16)
+    reader = _reader(pdf_bytes)
+    total = len(reader.pages)
+
+    if workers <= 1 or total < 2 * shard_pages:
+        for index, page in enumerate(reader.pages):
+            yield index, page.extract_text() or ""
+        return
+
+    # Several shards per worker keeps the pool busy when pages vary in cost.
+    shard_size = max(shard_pages, -(-total // (workers * 4)))
+    starts = list(range(0, total, shard_size))
+    stops = [min(start + shard_size, total) for start in starts]
+    logger.info("Extracting %d pages in %d shards across %d workers", total, len(starts), workers)
+
+    pool = _get_pool(workers)
+    fd, path = tempfile.mkstemp(prefix="pdf-extract-", suffix=".pdf")
+    pending: "deque[Future]" = deque()
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(pdf_bytes)
+        shards = iter(zip(starts, stops))
+        for start, stop in shards:
+            pending.append(pool.submit(_extract_range, path, start, stop))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            shard = pending.popleft().result()
+            for start, stop in shards:
+                pending.append(pool.submit(_extract_range, path, start, stop))
+                break
+            yield from shard
+    finally:
+        for future in pending:
+            future.cancel()
+        # Running shards may still be reading the file; POSIX keeps it readable
+        # after unlink, and a late worker error is discarded with its future.
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
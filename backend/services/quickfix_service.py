@@ -0,0 +1,349 @@
+"""
+quickfix_service.py — rule-based fixes for mechanical Python errors.
+
+Runs ahead of the LLM in debug_service.  Each rule pattern-matches the failure
+(traceback or AST) and proposes a patched script; a patch is only accepted once
+it runs cleanly in the sandbox.  Handles:
+  • NameError for a missing stdlib import (``math``, ``defaultdict`` …)
+  • NameError for a misspelled builtin or local name (``pritn`` → ``print``)
+  • IndentationError / TabError
+  • unclosed, unmatched or mismatched brackets
+  • unused imports of modules the sandbox bans
+"""
+from __future__ import annotations
+
+import ast
+import builtins
+import difflib
+import io
+import logging
+import re
+import threading
+import tokenize
+from typing import Callable, List, Optional, Tuple
+
+from backend.models.schemas import DebugResponse, LanguageType
+from backend.services.execution_service import _BANNED_MODULES, run_python, stdin_exhausted, trim_traceback
+
+logger = logging.getLogger(__name__)
+
+_MAX_PASSES = 3
+
+# Stdlib modules that are commonly used without being imported.
+_STDLIB_MODULES: frozenset[str] = frozenset({
+    "math", "random", "json", "re", "datetime", "time", "collections",
+    "itertools", "functools", "string", "statistics", "heapq", "bisect",
+    "copy", "operator", "decimal", "fractions", "typing", "dataclasses",
+    "enum", "textwrap", "calendar", "uuid", "hashlib", "base64", "pprint",
+}) - _BANNED_MODULES
+
+# Names usually imported with ``from <module> import <name>``.
+_FROM_IMPORTS: dict[str, str] = {
+    "defaultdict": "collections", "Counter": "collections", "deque": "collections",
+    "namedtuple": "collections", "OrderedDict": "collections",
+    "reduce": "functools", "lru_cache": "functools", "partial": "functools",
+    "permutations": "itertools", "combinations": "itertools", "product": "itertools",
+    "chain": "itertools", "heappush": "heapq", "heappop": "heapq", "heapify": "heapq",
+    "dataclass": "dataclasses", "Enum": "enum", "Fraction": "fractions",
+    "Decimal": "decimal", "List": "typing", "Dict": "typing", "Optional": "typing",
+    "Tuple": "typing", "Set": "typing", "Any": "typing", "sqrt": "math", "pi": "math",
+    "randint": "random", "choice": "random", "shuffle": "random", "sleep": "time",
+}
+
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+
+_NAME_ERROR_RE = re.compile(r"NameError: name '(\w+)' is not defined(?:\. Did you mean: '(\w+)'\?)?")
+
+Fix = Tuple[str, str]  # (patched code, one-line summary)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _syntax_error(code: str) -> Optional[SyntaxError]:
+    try:
+        ast.parse(code)
+    except SyntaxError as exc:
+        return exc
+    return None
+
+
+def _insert_import(code: str, statement: str) -> str:
+    """Insert an import after a leading docstring / __future__ imports."""
+    lines = code.splitlines()
+    insert_at = 0
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        tree = None
+    if tree is not None:
+        for node in tree.body:
+            is_docstring = (
+                isinstance(node, ast.Expr)
+                and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, str)
+            )
+            is_future = isinstance(node, ast.ImportFrom) and node.module == "__future__"
+            if not (is_docstring or is_future):
+                break
+            insert_at = node.end_lineno
+    lines.insert(insert_at, statement)
+    return "\n".join(lines) + "\n"
+
+
+def _rename(code: str, old: str, new: str) -> str:
+    """Rename bare-name tokens (not attributes, strings or comments)."""
+    tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    result = []
+    previous = None
+    for tok in tokens:
+        if tok.type == tokenize.NAME and tok.string == old and not (previous and previous.string == "."):
+            tok = tok._replace(string=new)
+        result.append(tok)
+        if tok.type not in (tokenize.NL, tokenize.COMMENT):
+            previous = tok
+    return tokenize.untokenize(result)
+
+
+def _string_continuation_lines(code: str) -> set:
+    """Line numbers (1-based) that start inside a multi-line string literal."""
+    # Tokenized without indentation (which never decides where a string ends),
+    # since the tokenizer rejects the mixed tabs this is used to repair.
+    probe = "\n".join(line.lstrip(" \t") for line in code.splitlines()) + "\n"
+    string_types = {tokenize.STRING, getattr(tokenize, "FSTRING_MIDDLE", tokenize.STRING)}
+    rows = set()
+    for tok in tokenize.generate_tokens(io.StringIO(probe).readline):
+        if tok.type in string_types and tok.end[0] > tok.start[0]:
+            rows.update(range(tok.start[0] + 1, tok.end[0] + 1))
+    return rows
+
+
+def _defined_names(code: str) -> List[str]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((a.asname or a.name).split(".")[0] for a in node.names)
+    return sorted(names)
+
+
+# ── Rules ─────────────────────────────────────────────────────────────────────
+
+def _fix_missing_import(code: str, stderr: str) -> Optional[Fix]:
+    match = _NAME_ERROR_RE.search(stderr)
+    if not match:
+        return None
+    name = match.group(1)
+    if name in _STDLIB_MODULES:
+        return _insert_import(code, f"import {name}"), f"Added missing `import {name}`."
+    module = _FROM_IMPORTS.get(name)
+    if module and module not in _BANNED_MODULES:
+        statement = f"from {module} import {name}"
+        return _insert_import(code, statement), f"Added missing `{statement}`."
+    return None
+
+
+def _fix_misspelled_name(code: str, stderr: str) -> Optional[Fix]:
+    match = _NAME_ERROR_RE.search(stderr)
+    if not match:
+        return None
+    name, suggestion = match.group(1), match.group(2)
+    if not suggestion:
+        candidates = [n for n in dir(builtins) if not n.startswith("_")] + _defined_names(code)
+        close = difflib.get_close_matches(name, candidates, n=1, cutoff=0.8)
+        suggestion = close[0] if close else None
+    if not suggestion or suggestion == name:
+        return None
+    return _rename(code, name, suggestion), f"Renamed misspelled `{name}` to `{suggestion}`."
+
+
+def _fix_indentation(code: str, stderr: str) -> Optional[Fix]:
+    error = _syntax_error(code)
+    if not isinstance(error, IndentationError) or not error.lineno:
+        return None
+    lines = code.splitlines()
+
+    in_string = _string_continuation_lines(code)
+    indents = [
+        (i, re.match(r"[ \t]*", line).end()) for i, line in enumerate(lines, start=1) if i not in in_string
+    ]
+    if any("\t" in lines[i - 1][:end] for i, end in indents):
+        # Only indentation: tabs inside string literals are part of the program.
+        for i, end in indents:
+            lines[i - 1] = lines[i - 1][:end].expandtabs(4) + lines[i - 1][end:]
+        return "\n".join(lines) + "\n", "Replaced tabs with spaces."
+
+    index = error.lineno - 1
+    if index >= len(lines):
+        return None
+    previous = next((lines[i] for i in range(index - 1, -1, -1) if lines[i].strip()), "")
+    prev_indent = len(previous) - len(previous.lstrip())
+    body = lines[index].lstrip()
+
+    levels = {len(line) - len(line.lstrip()) for line in lines[:index] if line.strip()}
+
+    if error.msg.startswith("unexpected indent"):
+        if re.match(r"(return|raise|break|continue|pass)\b", previous.strip()):
+            # After a block terminator the line could belong to any enclosing
+            # block, and a clean run cannot tell which one was meant.
+            return None
+        lines[index] = " " * prev_indent + body
+    elif error.msg.startswith("expected an indented block"):
+        lines[index] = " " * (prev_indent + 4) + body
+    elif error.msg.startswith("unindent does not match"):
+        current = len(lines[index]) - len(body)
+        valid = [level for level in levels if level < current]
+        if not valid:
+            return None
+        lines[index] = " " * max(valid) + body
+    else:
+        return None
+    return "\n".join(lines) + "\n", f"Fixed indentation on line {error.lineno}."
+
+
+def _fix_brackets(code: str, stderr: str) -> Optional[Fix]:
+    error = _syntax_error(code)
+    if error is None or isinstance(error, IndentationError) or not error.lineno:
+        return None
+    lines = code.splitlines()
+    index = error.lineno - 1
+    if index >= len(lines):
+        return None
+    line = lines[index]
+    col = (error.offset or 1) - 1
+
+    never_closed = re.match(r"'([(\[{])' was never closed", error.msg)
+    if never_closed:
+        lines[index] = line.rstrip() + _CLOSERS[never_closed.group(1)]
+        return "\n".join(lines) + "\n", f"Closed the unclosed `{never_closed.group(1)}` on line {error.lineno}."
+
+    unmatched = re.match(r"unmatched '([)\]}])'", error.msg)
+    if unmatched and col < len(line) and line[col] == unmatched.group(1):
+        lines[index] = line[:col] + line[col + 1:]
+        return "\n".join(lines) + "\n", f"Removed the unmatched `{unmatched.group(1)}` on line {error.lineno}."
+
+    mismatched = re.match(
+        r"closing parenthesis '([)\]}])' does not match opening parenthesis '([(\[{])'", error.msg
+    )
+    if mismatched and col < len(line) and line[col] == mismatched.group(1):
+        closer = _CLOSERS[mismatched.group(2)]
+        lines[index] = line[:col] + closer + line[col + 1:]
+        return "\n".join(lines) + "\n", f"Replaced `{mismatched.group(1)}` with `{closer}` on line {error.lineno}."
+    return None
+
+
+def _fix_banned_imports(code: str, stderr: str) -> Optional[Fix]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    removable: List[ast.stmt] = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules = [a for a in node.names if a.name.split(".")[0] in _BANNED_MODULES]
+            if modules and len(modules) == len(node.names):
+                if all((a.asname or a.name.split(".")[0]) not in used for a in modules):
+                    removable.append(node)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and node.module.split(".")[0] in _BANNED_MODULES:
+                if all((a.asname or a.name) not in used for a in node.names):
+                    removable.append(node)
+    if not removable:
+        return None
+
+    drop = {n for node in removable for n in range(node.lineno, node.end_lineno + 1)}
+    lines = [line for i, line in enumerate(code.splitlines(), start=1) if i not in drop]
+    names = sorted({
+        (node.module if isinstance(node, ast.ImportFrom) else node.names[0].name).split(".")[0]
+        for node in removable
+    })
+    return "\n".join(lines) + "\n", f"Removed unused sandbox-banned import(s): {', '.join(names)}."
+
+
+_RULES: List[Callable[[str, str], Optional[Fix]]] = [
+    _fix_indentation,
+    _fix_brackets,
+    _fix_banned_imports,
+    _fix_missing_import,
+    _fix_misspelled_name,
+]
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "resolved_locally": 0}
+
+
+def record_debug_request() -> None:
+    """Count a debug request; called once per request, whatever answers it."""
+    with _stats_lock:
+        _stats["requests"] += 1
+
+
+def record_local_resolution() -> None:
+    """Count a request answered without the LLM and log the running rate."""
+    with _stats_lock:
+        _stats["resolved_locally"] += 1
+        requests, resolved = _stats["requests"], _stats["resolved_locally"]
+    logger.info(
+        "Quick-fix resolved %d/%d debug requests locally (%.0f%%)",
+        resolved, requests, 100.0 * resolved / requests,
+    )
+
+
+def quick_fix_stats() -> dict:
+    with _stats_lock:
+        requests, resolved = _stats["requests"], _stats["resolved_locally"]
+    return {
+        "requests": requests,
+        "resolved_locally": resolved,
+        "local_fraction": resolved / requests if requests else 0.0,
+    }
+
+
+def try_quick_fix(code: str, stderr: str) -> Optional[DebugResponse]:
+    """Apply rules until the code runs cleanly; None means the LLM is needed.
+
+    Several passes are allowed because fixing one error (e.g. a bracket)
+    often reveals the next (e.g. a missing import).
+    """
+    summaries: List[str] = []
+    for _ in range(_MAX_PASSES):
+        fix = None
+        for rule in _RULES:
+            try:
+                fix = rule(code, stderr)
+            except (SyntaxError, tokenize.TokenError, ValueError):
+                fix = None
+            if fix is not None and fix[0] != code:
+                break
+            fix = None
+        if fix is None:
+            return None
+
+        code, summary = fix
+        summaries.append(summary)
+        result = run_python(code)
+        if result.timed_out or stdin_exhausted(result):
+            return None
+        if result.exit_code == 0:
+            return DebugResponse(
+                issue_summary=" ".join(summaries),
+                fixed_code=code,
+                language=LanguageType.PYTHON,
+            )
+        if trim_traceback(result.stderr) == trim_traceback(stderr):
+            return None  # no progress
+        stderr = result.stderr
+    return None
@@ -1,19 +1,64 @@
 """
-rag_service.py — PDF indexing and retrieval using Qdrant (local Docker) + Ollama embeddings.
+rag_service.py — PDF indexing and retrieval using Qdrant (local Docker) + Ollama or ONNX embeddings.
 Chat answers are generated by Groq.
+
+Storage modes (QDRANT_STORAGE_MODE):
+  per_book  one collection per book, ``learn-book-{book_id}`` (default)
+  shared    every book in one collection (QDRANT_SHARED_COLLECTION, default
+            ``learn-books``), tagged with an indexed ``book_id`` payload field;
+            searches and deletes filter on it
+
+Vector storage (applies to newly created collections):
+  QDRANT_QUANTIZATION=int8   scalar int8 quantization kept in RAM; searches
+                             oversample (QDRANT_OVERSAMPLING, default 2.0) and
+                             rescore against the original vectors
+  QDRANT_ON_DISK_VECTORS=1   keep original float32 vectors memory-mapped on disk
+  QDRANT_ON_DISK_PAYLOAD=1   keep payloads on disk
+
+Vector backend (RAG_VECTOR_BACKEND):
+  qdrant  every book in Qdrant (default)
+  local   every book in an in-process LocalVectorStore under RAG_LOCAL_STORE_DIR
+  auto    a book whose first PDF has at most RAG_LOCAL_MAX_PAGES pages
+          (default 50) goes local; later uploads stay where the book is
+Search uses the local store whenever one exists for the book.
+
+Callers always pass the per-book collection name; it is mapped to the physical
+collection here, so switching modes needs no change in routers or the agent.
 """
 
 from __future__ import annotations
+import asyncio
+import hashlib
+import importlib
 import logging
 import os
-import tempfile
-from typing import List
+import threading
+import time
+import uuid
+import weakref
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+    from backend.services.embedding_pipeline import IngestStats
+    from backend.services.local_vector_store import LocalVectorStore
 
 logger = logging.getLogger(__name__)
 
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 150
 
+BOOK_COLLECTION_PREFIX = "learn-book-"
+
+# Point ids are uuid5(namespace, "<collection>:<chunk hash>"), so the same chunk
+# of the same book always maps to the same point.
+_POINT_NAMESPACE = uuid.UUID("7f1c9a52-3d0e-4c8b-9a61-5e2f4b8d0c17")
+_DELETE_BATCH = 1000
+
 
 # ---------------- CLIENTS ---------------- #
 
@@ -29,25 +74,261 @@ def _qdrant_url() -> str:
     port = _env("QDRANT_PORT", "6333")
     return f"http://{host}:{port}"
 
+def _env_flag(name: str, default: str = "0") -> bool:
+    return _env(name, default).strip().lower() in ("1", "true", "yes")
+
+
+# Process-wide clients: built lazily on first use, then reused by every call.
+_clients_lock = threading.Lock()
+_client = None
+_embeddings = None
+# Embedding dimension per model (see _embedding_dim).
+_dimensions: Dict[str, int] = {}
+# Collections already verified/created in this process → their dimension.
+_ensured: Dict[str, int] = {}
+# Serialises collection creation and backend placement across parallel ingest jobs.
+_layout_lock = threading.Lock()
+# Book collection → True if its documents go to the local store (auto backend).
+_placements: Dict[str, bool] = {}
+
+
 def _make_client():
-    from qdrant_client import QdrantClient
+    """
+    Shared Qdrant client.  Set QDRANT_PREFER_GRPC=1 to send upserts and
+    searches over gRPC (QDRANT_GRPC_PORT, default 6334) instead of REST.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _clients_lock:
+        if _client is None:
+            from qdrant_client import QdrantClient
+
+            _client = QdrantClient(
+                url=_qdrant_url(),
+                api_key=_env("QDRANT_API_KEY", "") or None,
+                prefer_grpc=_env_flag("QDRANT_PREFER_GRPC"),
+                grpc_port=int(_env("QDRANT_GRPC_PORT", "6334")),
+            )
+    return _client
 
-    return QdrantClient(
-        url=_qdrant_url(),
-        api_key=_env("QDRANT_API_KEY", "") or None,
-        prefer_grpc=False,
-    )
+
+def _embedding_model() -> str:
+    from backend.services.embedding_service import embedding_model_key
+
+    return embedding_model_key()
 
 
 def _make_embeddings():
-    from langchain_ollama import OllamaEmbeddings
+    """Shared embeddings for the configured backend (EMBED_BACKEND, see embedding_service)."""
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+    with _clients_lock:
+        if _embeddings is None:
+            from backend.services.embedding_cache import CachedEmbeddings, get_embedding_cache
+            from backend.services.embedding_service import create_embeddings
+
+            embeddings = create_embeddings()
+            cache = get_embedding_cache()
+            # Chunks and repeated questions are only ever embedded once per model.
+            _embeddings = (
+                CachedEmbeddings(embeddings, _embedding_model(), cache) if cache else embeddings
+            )
+    return _embeddings
+
+
+def _sentence_embeddings(embeddings):
+    """
+    ``embeddings`` for the sentences context compression scores: cached apart
+    from PDF chunks so a stream of questions cannot evict a book's chunks.
+    """
+    for_namespace = getattr(embeddings, "for_namespace", None)
+    return for_namespace("sentence") if for_namespace is not None else embeddings
+
+
+def _embedding_dim() -> int:
+    """Vector size of the configured model; probed at most once per process."""
+    model = _embedding_model()
+    if model not in _dimensions:
+        _dimensions[model] = len(_make_embeddings().embed_query("dimension probe"))
+    return _dimensions[model]
+
+
+# ---------------- STORAGE LAYOUT ---------------- #
+
+def _shared_mode() -> bool:
+    return _env("QDRANT_STORAGE_MODE", "per_book").strip().lower() == "shared"
+
+
+def shared_collection_name() -> str:
+    return _env("QDRANT_SHARED_COLLECTION", "learn-books").strip() or "learn-books"
+
+
+def book_id_from_collection(collection_name: str) -> Optional[str]:
+    if collection_name.startswith(BOOK_COLLECTION_PREFIX):
+        return collection_name[len(BOOK_COLLECTION_PREFIX):]
+    return None
+
+
+def _resolve(collection_name: str) -> Tuple[str, Optional[str]]:
+    """Map a per-book collection name to (physical collection, book_id filter)."""
+    if _shared_mode():
+        book_id = book_id_from_collection(collection_name)
+        if book_id is None:
+            raise ValueError(f"Not a learn-book collection: {collection_name!r}")
+        return shared_collection_name(), book_id
+    return collection_name, None
+
+
+def _vector_backend() -> str:
+    backend = _env("RAG_VECTOR_BACKEND", "qdrant").strip().lower()
+    if backend not in ("qdrant", "local", "auto"):
+        raise ValueError(f"Unsupported RAG_VECTOR_BACKEND: {backend!r}")
+    return backend
+
+
+_local_stores: Dict[str, "LocalVectorStore"] = {}
+
+
+def _local_store_root() -> Path:
+    default_dir = Path(__file__).resolve().parent.parent / ".vector_store"
+    return Path(_env("RAG_LOCAL_STORE_DIR", "").strip() or default_dir)
+
+
+def _local_store(collection_name: str) -> "LocalVectorStore":
+    """One store object per book, so its loaded matrix is reused across searches."""
+    from backend.services.local_vector_store import LocalVectorStore
+
+    with _clients_lock:
+        store = _local_stores.get(collection_name)
+        if store is None:
+            store = _local_stores[collection_name] = LocalVectorStore(_local_store_root() / collection_name)
+        return store
+
+
+def _index_locally(pdf_bytes: bytes, collection_name: str) -> bool:
+    backend = _vector_backend()
+    if backend != "auto":
+        return backend == "local"
+    from backend.services.pdf_service import page_count
+
+    # Every upload of a book (legacy upload-pdf or a document) must go to the
+    # backend the book already uses, or retrieval (local store first) would miss
+    # the rest; the lock keeps uploads ingested in parallel from choosing differently.
+    with _layout_lock:
+        local = _placements.get(collection_name)
+        if local is None:
+            if _local_store(collection_name).exists():
+                local = True
+            elif _qdrant_has_book(collection_name):
+                local = False
+            else:
+                local = page_count(pdf_bytes) <= int(_env("RAG_LOCAL_MAX_PAGES", "50"))
+            _placements[collection_name] = local
+        return local
+
+
+def _qdrant_has_book(collection_name: str) -> bool:
+    client = _make_client()
+    target, book_id = _resolve(collection_name)
+    if not client.collection_exists(target):
+        return False
+    count_filter = _book_filter(book_id) if book_id is not None else None
+    return client.count(collection_name=target, count_filter=count_filter, exact=False).count > 0
+
+
+def _delete_from_qdrant(collection_name: str) -> None:
+    from qdrant_client.http.models import FilterSelector
+
+    client = _make_client()
+    target, book_id = _resolve(collection_name)
+    if book_id is not None:
+        if not client.collection_exists(target):
+            return
+        client.delete(
+            collection_name=target,
+            points_selector=FilterSelector(filter=_book_filter(book_id)),
+        )
+        return
+    client.delete_collection(target)
+    _ensured.pop(target, None)
+
+
+def vector_storage_config(
+    embedding_dim: int,
+    quantization: Optional[str] = None,
+    on_disk_vectors: Optional[bool] = None,
+    on_disk_payload: Optional[bool] = None,
+) -> dict:
+    """create_collection kwargs; unset arguments fall back to the QDRANT_* env options."""
+    from qdrant_client.http.models import (
+        Distance,
+        ScalarQuantization,
+        ScalarQuantizationConfig,
+        ScalarType,
+        VectorParams,
+    )
+
+    quantization = (quantization or _env("QDRANT_QUANTIZATION", "none")).strip().lower()
+    if on_disk_vectors is None:
+        on_disk_vectors = _env_flag("QDRANT_ON_DISK_VECTORS")
+    if on_disk_payload is None:
+        on_disk_payload = _env_flag("QDRANT_ON_DISK_PAYLOAD")
+
+    config = {
+        "vectors_config": VectorParams(
+            size=embedding_dim,
+            distance=Distance.COSINE,
+            on_disk=on_disk_vectors,
+        ),
+        "on_disk_payload": on_disk_payload,
+    }
+    if quantization == "int8":
+        config["quantization_config"] = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=float(_env("QDRANT_QUANTILE", "0.99")),
+                always_ram=True,
+            )
+        )
+    elif quantization not in ("", "none"):
+        raise ValueError(f"Unsupported QDRANT_QUANTIZATION: {quantization!r}")
+    return config
 
-    return OllamaEmbeddings(
-        model=_env("OLLAMA_EMBED_MODEL", "nomic-embed-text-v2-moe"),
-        base_url=_env("OLLAMA_BASE_URL", "http://localhost:11434"),
+
+def search_params():
+    """Rescore quantized candidates against the originals; None when unquantized."""
+    from qdrant_client.http.models import QuantizationSearchParams, SearchParams
+
+    if _env("QDRANT_QUANTIZATION", "none").strip().lower() in ("", "none"):
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=True,
+            oversampling=float(_env("QDRANT_OVERSAMPLING", "2.0")),
+        )
     )
 
 
+def _book_filter(book_id: str):
+    from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+    return Filter(must=[FieldCondition(key="book_id", match=MatchValue(value=book_id))])
+
+
+def _document_filter(book_id: Optional[str], document_id: Optional[str]):
+    """Points of one document of a book; ``document_id=None`` selects points stored without one."""
+    from qdrant_client.http.models import FieldCondition, Filter, IsEmptyCondition, MatchValue, PayloadField
+
+    must = [] if book_id is None else list(_book_filter(book_id).must)
+    if document_id is None:
+        must.append(IsEmptyCondition(is_empty=PayloadField(key="document_id")))
+    else:
+        must.append(FieldCondition(key="document_id", match=MatchValue(value=document_id)))
+    return Filter(must=must)
+
+
 def _make_llm():
     from langchain_groq import ChatGroq
 
@@ -64,19 +345,36 @@ def _make_llm():
 
 # ---------------- COLLECTION SAFE CREATE ---------------- #
 
-def _ensure_collection(collection_name: str, embedding_dim: int) -> None:
+def _ensure_collection(collection_name: str, embedding_dim: int, shared: bool = False) -> None:
     """
     Create collection dynamically using real embedding dimension.
     If exists with wrong dimension → delete & recreate.
+
+    The shared collection holds every book, so it is never recreated on a
+    dimension mismatch; it also gets a keyword index on ``book_id``.  Every
+    collection gets one on ``document_id`` for per-document diffing and deletes.
     """
-    from qdrant_client.http.models import Distance, VectorParams
+    if _ensured.get(collection_name) == embedding_dim:
+        return
+    with _layout_lock:
+        _ensure_collection_locked(collection_name, embedding_dim, shared)
 
-    client = _make_client()
 
-    try:
-        collection = client.get_collection(collection_name)
-        existing_dim = collection.config.params.vectors.size
+def _ensure_collection_locked(collection_name: str, embedding_dim: int, shared: bool) -> None:
+    from qdrant_client.http.models import PayloadSchemaType
+
+    if _ensured.get(collection_name) == embedding_dim:
+        return  # created by a parallel ingest job while we waited
 
+    client = _make_client()
+
+    if client.collection_exists(collection_name):
+        existing_dim = client.get_collection(collection_name).config.params.vectors.size
+        if existing_dim != embedding_dim and shared:
+            raise RuntimeError(
+                f"Shared collection '{collection_name}' has dimension {existing_dim}, "
+                f"but the embedding model produces {embedding_dim}"
+            )
         if existing_dim != embedding_dim:
             logger.warning(
                 "Dimension mismatch (existing=%s, new=%s). Recreating collection...",
@@ -84,117 +382,528 @@ def _ensure_collection(collection_name: str, embedding_dim: int) -> None:
                 embedding_dim,
             )
             client.delete_collection(collection_name)
-            raise Exception("Recreate")
-
-        logger.info("Collection already exists with correct dimension.")
+        else:
+            logger.info("Collection already exists with correct dimension.")
+            _ensured[collection_name] = embedding_dim
+            return
 
-    except Exception:
-        client.recreate_collection(
+    client.create_collection(
+        collection_name=collection_name,
+        **vector_storage_config(embedding_dim),
+    )
+    for field_name in ("book_id", "document_id") if shared else ("document_id",):
+        client.create_payload_index(
             collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=embedding_dim,
-                distance=Distance.COSINE,
-            ),
+            field_name=field_name,
+            field_schema=PayloadSchemaType.KEYWORD,
         )
-        logger.info("Created collection '%s' (dim=%s)", collection_name, embedding_dim)
+    logger.info("Created collection '%s' (dim=%s)", collection_name, embedding_dim)
+
+    _ensured[collection_name] = embedding_dim
 
 
 # ---------------- INDEX PDF ---------------- #
 
-def index_pdf(pdf_bytes: bytes, collection_name: str) -> int:
-    from langchain_community.document_loaders import PyPDFLoader
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
-    from langchain_qdrant import Qdrant
+def _iter_pages(pdf_bytes: bytes, source: str) -> Iterator["Document"]:
+    """Yield one Document per non-empty page, in page order."""
+    from langchain_core.documents import Document
 
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        tmp.write(pdf_bytes)
-        tmp_path = tmp.name
+    from backend.services.pdf_service import extract_pages
 
-    try:
-        loader = PyPDFLoader(tmp_path)
-        docs = loader.load()
-    finally:
-        os.unlink(tmp_path)
+    for index, text in extract_pages(pdf_bytes):
+        if text.strip():
+            yield Document(page_content=text, metadata={"source": source, "page": index})
 
-    if not docs:
-        return 0
+
+def _iter_chunks(pages: Iterable["Document"]) -> Iterator["Document"]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
     )
+    for page in pages:
+        yield from splitter.split_documents([page])
 
-    chunks = splitter.split_documents(docs)
 
-    embeddings = _make_embeddings()
+def chunk_hash(chunk: "Document") -> str:
+    """Content hash of a chunk, scoped to its page so citations stay correct."""
+    page = chunk.metadata.get("page", "")
+    return hashlib.sha256(f"{page}\x00{chunk.page_content}".encode("utf-8")).hexdigest()
+
+
+def _point_scope(collection_name: str, document_id: Optional[str] = None) -> str:
+    """
+    Namespace of a book's (or document's) point ids.  It includes the embedding
+    model, so after a model switch every chunk counts as new and the old
+    model's vectors are deleted as stale instead of being kept.
+    """
+    scope = collection_name if document_id is None else f"{collection_name}/{document_id}"
+    return f"{_embedding_model()}|{scope}"
 
-    # 🔥 Dynamically detect embedding dimension
-    test_vector = embeddings.embed_query("dimension test")
-    embedding_dim = len(test_vector)
 
-    _ensure_collection(collection_name, embedding_dim)
+def _point_id(scope: str, digest: str) -> str:
+    return str(uuid.uuid5(_POINT_NAMESPACE, f"{scope}:{digest}"))
 
+
+def _existing_point_ids(target: str, book_id: Optional[str], document_id: Optional[str] = None) -> set:
+    """Ids of every point already stored for this document of the book (empty if nothing is)."""
     client = _make_client()
-    vector_store = Qdrant.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        client=client,
-        collection_name=collection_name,
+    if not client.collection_exists(target):
+        return set()
+
+    ids: set = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=target,
+            scroll_filter=_document_filter(book_id, document_id),
+            limit=1000,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids.update(str(point.id) for point in points)
+        if offset is None:
+            return ids
+
+
+def index_pdf(
+    pdf_bytes: bytes,
+    collection_name: str,
+    source: str = "PDF",
+    on_progress: Optional[Callable[["IngestStats"], None]] = None,
+    document_id: Optional[str] = None,
+) -> "IngestStats":
+    """
+    Stream a PDF into Qdrant: pages are parsed and split lazily, then embedded
+    with bounded concurrency and adaptive batch sizes while earlier batches are
+    upserted, so memory stays flat regardless of page count.
+
+    Running headers/footers are stripped from pages and near-duplicate chunks
+    are dropped before embedding (see dedupe_service).
+
+    Small books may be indexed into a LocalVectorStore instead (see
+    RAG_VECTOR_BACKEND); a legacy upload then removes the legacy points an
+    earlier upload left in the other backend.
+
+    With ``document_id`` the PDF is one of several documents of the book: its
+    points carry that id, and diffing and stale deletes only touch them.  The
+    book's other documents stay where they are.
+
+    Re-uploads are incremental: each chunk's point id is derived from its
+    content hash and the embedding model, chunks already stored are skipped,
+    and stored chunks that no longer occur in the PDF (or were embedded by
+    another model) are deleted once the new ones are in.
+
+    ``on_progress`` is called with the running IngestStats after every upsert.
+    """
+    import numpy as np
+    from qdrant_client.http.models import PointIdsList, PointStruct
+
+    from backend.services import retrieval_cache
+    from backend.services.dedupe_service import boilerplate_stripper, near_duplicate_filter
+    from backend.services.embedding_pipeline import EmbeddingPipeline
+    from backend.services.embedding_service import embed_documents_array
+
+    embeddings = _make_embeddings()
+    local = _index_locally(pdf_bytes, collection_name)
+    store = _local_store(collection_name) if local else None
+    if store is not None:
+        existing = store.document_ids(document_id)
+    else:
+        client = _make_client()
+        target, book_id = _resolve(collection_name)
+        # A collection built for another dimension is recreated here, before
+        # diffing, so none of its points are mistaken for unchanged chunks.
+        _ensure_collection(target, _embedding_dim(), shared=book_id is not None)
+        existing = _existing_point_ids(target, book_id, document_id)
+    scope = _point_scope(collection_name, document_id)
+
+    def _upsert(batch: list, vectors: Sequence[Sequence[float]]) -> None:
+        # Payload layout matches langchain_qdrant so either side can read it.
+        payloads = [
+            {
+                "page_content": chunk.page_content,
+                "metadata": chunk.metadata,
+                "chunk_hash": hashes.pop(chunk.id),
+                **({"document_id": document_id} if document_id is not None else {}),
+            }
+            for chunk in batch
+        ]
+        if store is not None:
+            store.upsert([chunk.id for chunk in batch], vectors, payloads)
+            return
+
+        extra = {"book_id": book_id} if book_id is not None else {}
+        # Qdrant's models take lists; the local store above keeps the float32 array.
+        rows = np.asarray(vectors, dtype=np.float32).tolist()
+        client.upsert(
+            collection_name=target,
+            points=[
+                PointStruct(id=chunk.id, vector=vector, payload={**payload, **extra})
+                for chunk, vector, payload in zip(batch, rows, payloads)
+            ],
+        )
+
+    seen: set = set()
+    hashes: Dict[str, str] = {}  # point id → chunk hash, until upserted
+
+    def _counted(pages: Iterable["Document"]) -> Iterator["Document"]:
+        for page in pages:
+            pipeline.stats.pages_parsed += 1
+            yield page
+
+    def _new_chunks(chunks: Iterable["Document"]) -> Iterator["Document"]:
+        for chunk in chunks:
+            digest = chunk_hash(chunk)
+            point_id = _point_id(scope, digest)
+            if point_id in seen:
+                continue  # identical chunk twice on one page
+            seen.add(point_id)
+            if point_id in existing:
+                pipeline.stats.chunks_unchanged += 1
+                continue
+            chunk.id = point_id
+            hashes[point_id] = digest
+            yield chunk
+
+    stripper = boilerplate_stripper()
+    dedupe = near_duplicate_filter()
+
+    def _filtered_stats(stats: "IngestStats") -> "IngestStats":
+        if stripper is not None:
+            stats.boilerplate_lines_removed = stripper.lines_removed
+        if dedupe is not None:
+            stats.chunks_near_duplicate = dedupe.duplicates
+        return stats
+
+    pipeline = EmbeddingPipeline(
+        lambda texts: embed_documents_array(embeddings, texts),
+        _upsert,
+        on_progress=(lambda stats: on_progress(_filtered_stats(stats))) if on_progress else None,
+    )
+
+    pages = _counted(_iter_pages(pdf_bytes, source))
+    if stripper is not None:
+        pages = stripper.run(pages)
+    chunks = _iter_chunks(pages)
+    if dedupe is not None:
+        chunks = dedupe.run(chunks)
+    try:
+        stats = _filtered_stats(pipeline.run(_new_chunks(chunks)))
+
+        stale = sorted(existing - seen)
+        if store is not None:
+            store.delete(stale)
+        else:
+            for start in range(0, len(stale), _DELETE_BATCH):
+                client.delete(
+                    collection_name=target,
+                    points_selector=PointIdsList(points=stale[start:start + _DELETE_BATCH]),
+                )
+        stats.chunks_deleted = len(stale)
+        if document_id is None:
+            _drop_other_backend(collection_name, store is not None)
+    finally:
+        # Even a failed run may have changed what the collection returns.
+        retrieval_cache.bump_generation(collection_name)
+    if on_progress is not None:
+        on_progress(stats)
+
+    logger.info(
+        "Indexed '%s' | new=%d | unchanged=%d | deleted=%d | near-duplicate=%d | "
+        "boilerplate lines=%d | failed=%d",
+        collection_name, stats.chunks_upserted, stats.chunks_unchanged, stats.chunks_deleted,
+        stats.chunks_near_duplicate, stats.boilerplate_lines_removed, stats.chunks_failed,
     )
+    return stats
+
+
+def _drop_other_backend(collection_name: str, indexed_locally: bool) -> None:
+    """
+    Remove what an earlier legacy upload (points without a document_id) left
+    in the other backend.  The book's documents are never touched here.
+    """
+    from qdrant_client.http.models import FilterSelector
 
-    return len(chunks)
+    if not indexed_locally:
+        store = _local_store(collection_name)
+        if store.exists():
+            store.delete(sorted(store.document_ids(None)))
+            if not len(store):
+                store.drop()  # an empty store would still shadow Qdrant in searches
+        return
+    if _vector_backend() == "local":
+        return  # Qdrant may not even be running
+    try:
+        client = _make_client()
+        target, book_id = _resolve(collection_name)
+        if client.collection_exists(target):
+            client.delete(
+                collection_name=target,
+                points_selector=FilterSelector(filter=_document_filter(book_id, None)),
+            )
+    except Exception as exc:
+        logger.debug("No Qdrant copy of '%s' to remove: %s", collection_name, exc)
 
 
 # ---------------- SEARCH ---------------- #
 
+def _query_key(question: str) -> tuple:
+    from backend.services import retrieval_cache
+
+    return (_embedding_model(), retrieval_cache.normalize_question(question))
+
+
+def _query_vector(question: str) -> List[float]:
+    from backend.services import retrieval_cache
+
+    key = _query_key(question)
+    vector = retrieval_cache.queries.get(key)
+    if vector is None:
+        vector = _make_embeddings().embed_query(question)
+        retrieval_cache.queries.put(key, vector)
+    return vector
+
+
 def search_context(question: str, collection_name: str, k: int = 3):
-    from langchain_qdrant import Qdrant
+    """
+    Top-k chunks formatted as prompt context, plus "Page N — source" citations.
+    Repeated questions are answered from retrieval_cache until the collection
+    is re-indexed or deleted.
+    """
+    from backend.services import retrieval_cache
 
-    embeddings = _make_embeddings()
+    key = _result_key(question, collection_name, k)
+    cached = retrieval_cache.results.get(key)
+    if cached is not None:
+        return cached[0], list(cached[1])
 
-    vector_store = Qdrant(
-        client=_make_client(),
-        collection_name=collection_name,
-        embeddings=embeddings,
+    context, sources = _search_uncached(question, collection_name, k)
+    retrieval_cache.results.put(key, (context, tuple(sources)))
+    return context, sources
+
+
+def _result_key(question: str, collection_name: str, k: int) -> tuple:
+    from backend.services import retrieval_cache
+
+    return (
+        collection_name,
+        retrieval_cache.generation(collection_name),
+        retrieval_cache.normalize_question(question),
+        k,
     )
 
-    results = vector_store.similarity_search(question, k=k)
 
-    if not results:
-        return "", []
+def _retrieve(query_vector: List[float], collection_name: str, limit: int, with_vectors: bool = False) -> list:
+    """
+    (payload, vector) pairs for the nearest chunks, best first.  Qdrant only
+    returns the vectors (for MMR) when ``with_vectors`` is set.
+    """
+    hits = _local_retrieve(query_vector, collection_name, limit)
+    if hits is not None:
+        return hits
+
+    response = _make_client().query_points(
+        **_query_kwargs(query_vector, collection_name, limit, with_vectors)
+    )
+    return [(point.payload or {}, point.vector) for point in response.points]
+
+
+def _local_retrieve(query_vector: List[float], collection_name: str, limit: int) -> Optional[list]:
+    """_retrieve against the book's local store; None if the book has none."""
+    store = _local_store(collection_name)
+    if not store.exists():
+        return None
+    return [(payload, vector) for _, payload, vector in store.search(query_vector, limit)]
+
+
+def _query_kwargs(
+    query_vector: List[float], collection_name: str, limit: int, with_vectors: bool = False
+) -> dict:
+    target, book_id = _resolve(collection_name)
+    return {
+        "collection_name": target,
+        "query": query_vector,
+        "query_filter": _book_filter(book_id) if book_id is not None else None,
+        "search_params": search_params(),
+        "limit": limit,
+        "with_payload": True,
+        "with_vectors": with_vectors,
+    }
+
 
+def _format_context(payloads: List[dict]):
     context_parts = []
     sources = []
 
-    for result in results:
-        meta = result.metadata or {}
+    for payload in payloads:
+        meta = payload.get("metadata") or {}
         page = meta.get("page", "?")
         source = meta.get("source", "PDF")
 
         context_parts.append(
-            f"Page Content:\n{result.page_content}\nPage: {page}\nSource: {source}"
+            f"Page Content:\n{payload.get('page_content', '')}\nPage: {page}\nSource: {source}"
         )
         sources.append(f"Page {page} — {source}")
 
-    return "\n\n---\n\n".join(context_parts), sources
+    # Several chunks of one page share a citation; list it once, best hit first.
+    return "\n\n---\n\n".join(context_parts), list(dict.fromkeys(sources))
 
 
-# ---------------- ASK ---------------- #
+def _search_uncached(question: str, collection_name: str, k: int):
+    from backend.services import context_compression
+    from backend.services.embedding_service import embed_documents_array
 
-def ask(question: str, collection_name: str, k: int = 3) -> dict:
-    from langchain_core.messages import HumanMessage, SystemMessage
+    query_vector = _query_vector(question)
 
-    context, sources = search_context(question, collection_name, k)
+    if not context_compression.enabled():
+        hits = _retrieve(query_vector, collection_name, k)
+        return _format_context([payload for payload, _ in hits]) if hits else ("", [])
 
-    if not context:
-        return {
-            "answer": "I couldn't find relevant information in the document.",
-            "sources": [],
-        }
+    # Over-fetch so MMR has alternatives to near-duplicate chunks.
+    hits = _retrieve(query_vector, collection_name, k * context_compression.overfetch(), with_vectors=True)
+    embeddings = _sentence_embeddings(_make_embeddings())
+    return context_compression.compress(
+        query_vector, hits, k, lambda texts: embed_documents_array(embeddings, texts)
+    )
 
-    llm = _make_llm()
 
-    messages = [
+# ---------------- ASYNC ---------------- #
+
+# AsyncQdrantClient wraps an httpx.AsyncClient, which belongs to one event loop;
+# the API server and the LiveKit agent each run their own.
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _make_async_client():
+    from qdrant_client import AsyncQdrantClient
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncQdrantClient(
+            url=_qdrant_url(),
+            api_key=_env("QDRANT_API_KEY", "") or None,
+            prefer_grpc=_env_flag("QDRANT_PREFER_GRPC"),
+            grpc_port=int(_env("QDRANT_GRPC_PORT", "6334")),
+        )
+    return client
+
+
+async def _aclient():
+    """_make_async_client, with the first (import-heavy) construction in a thread."""
+    if asyncio.get_running_loop() not in _async_clients:
+        await asyncio.to_thread(importlib.import_module, "qdrant_client")
+    return _make_async_client()
+
+
+async def _aembeddings():
+    """_make_embeddings; the first call loads the model and opens the cache, so off the loop."""
+    if _embeddings is not None:
+        return _embeddings
+    return await asyncio.to_thread(_make_embeddings)
+
+
+async def _aquery_vector(question: str) -> List[float]:
+    from backend.services import retrieval_cache
+
+    key = _query_key(question)
+    vector = retrieval_cache.queries.get(key)
+    if vector is None:
+        vector = await (await _aembeddings()).aembed_query(question)
+        retrieval_cache.queries.put(key, vector)
+    return vector
+
+
+async def _aretrieve(
+    query_vector: List[float], collection_name: str, limit: int, with_vectors: bool = False
+) -> list:
+    # The first search of a book loads its store from disk (and any search may
+    # reload it after a re-index), so the local path runs in a thread.
+    hits = await asyncio.to_thread(_local_retrieve, query_vector, collection_name, limit)
+    if hits is not None:
+        return hits
+
+    client = await _aclient()
+    response = await client.query_points(
+        **_query_kwargs(query_vector, collection_name, limit, with_vectors)
+    )
+    return [(point.payload or {}, point.vector) for point in response.points]
+
+
+async def asearch_context(question: str, collection_name: str, k: int = 3):
+    """search_context on native async Qdrant and embedding clients."""
+    from backend.services import context_compression, retrieval_cache
+
+    key = _result_key(question, collection_name, k)
+    cached = retrieval_cache.results.get(key)
+    if cached is not None:
+        return cached[0], list(cached[1])
+
+    query_vector = await _aquery_vector(question)
+    if context_compression.enabled():
+        hits = await _aretrieve(
+            query_vector, collection_name, k * context_compression.overfetch(), with_vectors=True
+        )
+        context, sources = await context_compression.acompress(
+            query_vector, hits, k, _sentence_embeddings(await _aembeddings()).aembed_documents
+        )
+    else:
+        hits = await _aretrieve(query_vector, collection_name, k)
+        context, sources = _format_context([payload for payload, _ in hits]) if hits else ("", [])
+
+    retrieval_cache.results.put(key, (context, tuple(sources)))
+    return context, sources
+
+
+_WARM_UP_MODULES = (
+    "qdrant_client",
+    "backend.services.context_compression",
+    "backend.services.retrieval_cache",
+)
+
+
+def _import_modules(modules: Sequence[str]) -> None:
+    for name in modules:
+        importlib.import_module(name)
+
+
+async def awarm_up(collection_name: str, modules: Sequence[str] = ()) -> None:
+    """
+    Pay a book's cold-start costs before its first question: module imports
+    and client construction, loading the embedding model in its backend, and
+    reading the book's vectors (Qdrant segments or the local store's files).
+
+    Blocking steps run in threads, so the task can be cancelled between them.
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(_import_modules, (*_WARM_UP_MODULES, *modules))
+    embeddings = await asyncio.to_thread(_make_embeddings)
+    # Past the embedding cache, or a cached query vector would skip the model load.
+    vector = await getattr(embeddings, "uncached", embeddings).aembed_query("warm-up")
+
+    store = _local_store(collection_name)
+    if store.exists():
+        await asyncio.to_thread(store.search, vector, 1)
+    elif _vector_backend() != "local":
+        client = await _aclient()
+        target, _ = _resolve(collection_name)
+        if await client.collection_exists(target):
+            await client.query_points(**_query_kwargs(vector, collection_name, 1))
+    logger.info("Warmed up '%s' in %.2fs", collection_name, time.perf_counter() - started)
+
+
+# ---------------- ASK ---------------- #
+
+_NO_CONTEXT_ANSWER = "I couldn't find relevant information in the document."
+
+
+def _answer_messages(question: str, context: str) -> list:
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    return [
         SystemMessage(
             content=(
                 "Answer strictly based on the provided context. "
@@ -205,7 +914,18 @@ def ask(question: str, collection_name: str, k: int = 3) -> dict:
         HumanMessage(content=question),
     ]
 
-    response = llm.invoke(messages)
+
+def ask(question: str, collection_name: str, k: int = 3) -> dict:
+    context, sources = search_context(question, collection_name, k)
+
+    if not context:
+        return {
+            "answer": _NO_CONTEXT_ANSWER,
+            "sources": [],
+        }
+
+    llm = _make_llm()
+    response = llm.invoke(_answer_messages(question, context))
 
     return {
         "answer": response.content,
@@ -213,8 +933,148 @@ def ask(question: str, collection_name: str, k: int = 3) -> dict:
     }
 
 
+async def astream_answer(
+    question: str, collection_name: str, k: int = 3
+) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming ``ask``: yields ("sources", [...]) once retrieval is done, then
+    ("token", text) for every chunk the chat model produces.
+    """
+    context, sources = await asearch_context(question, collection_name, k)
+    yield "sources", sources
+
+    if not context:
+        yield "token", _NO_CONTEXT_ANSWER
+        return
+
+    llm = await asyncio.to_thread(_make_llm)  # first call imports langchain_groq
+    async for chunk in llm.astream(_answer_messages(question, context)):
+        if chunk.content:
+            yield "token", chunk.content
+
+
 # ---------------- DELETE ---------------- #
 
+def delete_document(collection_name: str, document_id: str) -> None:
+    """Remove one document's vectors; the book's other documents are untouched."""
+    from qdrant_client.http.models import FilterSelector
+
+    from backend.services import retrieval_cache
+
+    try:
+        store = _local_store(collection_name)
+        if store.exists():
+            store.delete(sorted(store.document_ids(document_id)))
+        if _vector_backend() != "local":
+            client = _make_client()
+            target, book_id = _resolve(collection_name)
+            if client.collection_exists(target):
+                client.delete(
+                    collection_name=target,
+                    points_selector=FilterSelector(filter=_document_filter(book_id, document_id)),
+                )
+    finally:
+        retrieval_cache.bump_generation(collection_name)
+
+
+def count_vectors(collection_name: str) -> int:
+    """Chunks stored for a book across all its documents, in whichever backend holds them."""
+    store = _local_store(collection_name)
+    if store.exists():
+        return len(store)
+    if _vector_backend() == "local":
+        return 0
+    client = _make_client()
+    target, book_id = _resolve(collection_name)
+    if not client.collection_exists(target):
+        return 0
+    count_filter = _book_filter(book_id) if book_id is not None else None
+    return client.count(collection_name=target, count_filter=count_filter, exact=True).count
+
+
 def delete_collection(collection_name: str) -> None:
+    """
+    Remove a book's vectors: its local store, plus its Qdrant collection (or,
+    in shared mode, its points) unless the local backend is forced.
+    """
+    from backend.services import retrieval_cache
+
+    with _layout_lock:
+        _placements.pop(collection_name, None)
+    try:
+        _local_store(collection_name).drop()
+        if _vector_backend() != "local":
+            _delete_from_qdrant(collection_name)
+    finally:
+        retrieval_cache.bump_generation(collection_name)
+
+
+# ---------------- ORPHAN CLEANUP ---------------- #
+
+# Upper bound on distinct book ids read from the shared collection per facet call.
+_FACET_LIMIT = 1_000_000
+
+
+def stored_book_ids() -> Set[str]:
+    """
+    Ids of every book that has vectors anywhere: local stores, per-book
+    collections and the shared collection, whatever the current storage mode.
+    """
+    found: Set[str] = set()
+    root = _local_store_root()
+    if root.is_dir():
+        found.update(
+            book_id for path in root.iterdir()
+            if path.is_dir() and (book_id := book_id_from_collection(path.name))
+        )
+    if _vector_backend() == "local":
+        return found
+
     client = _make_client()
-    client.delete_collection(collection_name)
+    shared = shared_collection_name()
+    for collection in client.get_collections().collections:
+        book_id = book_id_from_collection(collection.name)
+        if book_id and collection.name != shared:
+            found.add(book_id)
+    if client.collection_exists(shared):
+        facet = client.facet(collection_name=shared, key="book_id", limit=_FACET_LIMIT, exact=True)
+        found.update(str(hit.value) for hit in facet.hits)
+    return found
+
+
+def purge_book(book_id: str) -> int:
+    """
+    Remove a book's vectors from every layout (local store, per-book
+    collection, shared collection) and return how many were removed.
+    """
+    from qdrant_client.http.models import FilterSelector
+
+    from backend.services import retrieval_cache
+
+    collection_name = f"{BOOK_COLLECTION_PREFIX}{book_id}"
+    removed = 0
+    with _layout_lock:
+        _placements.pop(collection_name, None)
+    try:
+        store = _local_store(collection_name)
+        if store.exists():
+            removed += len(store)
+            store.drop()
+        if _vector_backend() == "local":
+            return removed
+
+        client = _make_client()
+        if client.collection_exists(collection_name):
+            removed += client.count(collection_name=collection_name, exact=True).count
+            client.delete_collection(collection_name)
+            _ensured.pop(collection_name, None)
+        shared = shared_collection_name()
+        if client.collection_exists(shared):
+            book_filter = _book_filter(book_id)
+            count = client.count(collection_name=shared, count_filter=book_filter, exact=True).count
+            if count:
+                client.delete(collection_name=shared, points_selector=FilterSelector(filter=book_filter))
+                removed += count
+        return removed
+    finally:
+        retrieval_cache.bump_generation(collection_name)
@@ -0,0 +1,89 @@
+"""
+repl_worker.py — long-lived interpreter process behind a persistent run session.
+
+Launched by session_service as a standalone script (it must not import anything
+from ``backend``).  Requests arrive as one JSON object per line on stdin:
+
+    {"op": "exec", "forget": ["y"],
+     "cells": [{"line": 1, "source": "x = 1"}, {"line": 2, "source": "print(x)"}]}
+
+and exactly one JSON line is written back per request:
+
+    {"stdout": "...", "stderr": "...", "exit_code": 0, "ok_cells": 2,
+     "cells": [["", ""], ["1\n", ""]]}
+
+Cells run in order in a single namespace that survives between requests; names
+in ``forget`` are removed from it first.  The first failing cell stops the
+batch; ``ok_cells`` tells the parent how many cells completed normally (not
+through an exception or sys.exit) so it knows which state it can rely on, and ``cells`` holds the (stdout, stderr) of every cell
+that ran so the parent can replay them later without re-running.
+"""
+import contextlib
+import io
+import json
+import sys
+import traceback
+
+
+def _exec_cell(cell, namespace):
+    """Run one cell; returns (stdout, stderr, exit_code, completed)."""
+    out = io.StringIO()
+    err = io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            # Pad with blank lines so tracebacks report the line in the full script.
+            source = "\n" * (cell["line"] - 1) + cell["source"]
+            exec(compile(source, "main.py", "exec"), namespace)
+        except SystemExit as exc:
+            code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+            return out.getvalue(), err.getvalue(), code, False
+        except BaseException as exc:  # noqa: BLE001 - report every user error
+            # Drop this module's frame so the trace starts at the user's code.
+            err.write("".join(traceback.format_exception(type(exc), exc, exc.__traceback__.tb_next)))
+            return out.getvalue(), err.getvalue(), 1, False
+    return out.getvalue(), err.getvalue(), 0, True
+
+
+def _exec_cells(cells, namespace, forget=()):
+    for name in forget:
+        namespace.pop(name, None)
+    outputs = []
+    ok_cells = 0
+    exit_code = 0
+    for cell in cells:
+        stdout, stderr, exit_code, completed = _exec_cell(cell, namespace)
+        outputs.append([stdout, stderr])
+        if not completed:
+            break  # an exception or sys.exit() ends the batch
+        ok_cells += 1
+    return {
+        "stdout": "".join(stdout for stdout, _ in outputs),
+        "stderr": "".join(stderr for _, stderr in outputs),
+        "exit_code": exit_code,
+        "ok_cells": ok_cells,
+        "cells": outputs,
+    }
+
+
+def main():
+    channel_in = sys.stdin
+    channel_out = sys.stdout
+    # User code must never read from or write to the protocol channel.
+    sys.stdin = io.StringIO("")
+    namespace = {"__name__": "__main__"}
+
+    for line in channel_in:
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        if request.get("op") == "exec":
+            response = _exec_cells(request.get("cells", []), namespace, request.get("forget", ()))
+        else:
+            response = {"stdout": "", "stderr": "Unknown op", "exit_code": 1, "ok_cells": 0, "cells": []}
+        channel_out.write(json.dumps(response) + "\n")
+        channel_out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+retrieval_cache.py — in-memory caches in front of search_context.
+
+  results     (collection, generation, normalised question, k) → (context, sources)
+  queries     (embedding model, normalised question) → query vector
+
+Every collection has a generation counter that index_pdf and delete_collection
+bump, so cached results never outlive a re-index or delete in this process.
+The agent worker is a separate process, so entries also expire after a TTL.
+
+Configuration:
+  RAG_RESULT_CACHE_SIZE        cached retrievals (default 512, 0 disables)
+  RAG_RESULT_CACHE_TTL_S       seconds a cached retrieval stays valid (default 300)
+  RAG_QUERY_EMBED_CACHE_SIZE   cached query vectors (default 1024, 0 disables)
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the answer."""
+    return _SPACE_RE.sub(" ", question).strip().rstrip("?!.").strip().lower()
+
+
+class LRUCache:
+    """Thread-safe LRU with an optional per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_s: Optional[float] = None) -> None:
+        self._max = max_entries
+        self._ttl = ttl_s
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._ttl is not None and time.monotonic() - entry[0] > self._ttl:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value) -> None:
+        if self._max <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+results = LRUCache(
+    _env_int("RAG_RESULT_CACHE_SIZE", 512),
+    ttl_s=float(os.environ.get("RAG_RESULT_CACHE_TTL_S", "300")),
+)
+queries = LRUCache(_env_int("RAG_QUERY_EMBED_CACHE_SIZE", 1024))
+
+_generations: Dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+def generation(collection_name: str) -> int:
+    with _generations_lock:
+        return _generations.get(collection_name, 0)
+
+
+def bump_generation(collection_name: str) -> None:
+    """Invalidate every cached retrieval for the collection."""
+    with _generations_lock:
+        _generations[collection_name] = _generations.get(collection_name, 0) + 1
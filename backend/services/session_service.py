@@ -0,0 +1,385 @@
+"""
+session_service.py — opt-in persistent Python sessions for incremental runs.
+
+Each (user, project) pair gets its own long-lived interpreter process
+(see repl_worker.py).  Code is split into top-level statements ("cells"); a
+run only re-executes cells from the first changed one onward when that gives
+the same output as running the whole script fresh:
+
+  • Cells replaced by the edit already ran and may have changed the objects
+    they used, so earlier cells binding any name they reference re-run too
+    (repeated until no kept cell is touched).
+  • If the replaced cells may have changed state the analysis cannot see
+    (they reference a function or class defined in a kept cell, or use
+    exec/eval/globals), the interpreter restarts and everything re-runs.
+  • Names bound only by the replaced cells are removed from the namespace.
+  • The output of kept cells is replayed from the run that produced it, and
+    an unchanged script returns its previous result without executing.
+
+Names bound by ``import`` are not counted as touched: re-importing would not
+reset a module's state anyway (/run/reset does).
+
+Sessions are capped in memory, killed after an idle timeout and evicted in LRU
+order when too many are open.
+
+Sessions are capped in memory, killed after an idle timeout and evicted in LRU
+order when too many are open.
+"""
+from __future__ import annotations
+
+import ast
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+from backend.models.schemas import RunResult
+from backend.services.execution_service import _precheck, _safe_env
+
+logger = logging.getLogger(__name__)
+
+_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "repl_worker.py")
+
+SessionKey = Tuple[str, str]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def split_cells(code: str) -> List[Tuple[int, str]]:
+    """
+    Split a script into (first line, source) per top-level statement.
+    Statements sharing a line (``a = 1; b = 2``) stay in one cell.
+    """
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    spans: List[List[int]] = []
+    for node in tree.body:
+        start = node.lineno
+        for decorator in getattr(node, "decorator_list", []):
+            start = min(start, decorator.lineno)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], node.end_lineno)
+        else:
+            spans.append([start, node.end_lineno])
+    return [(start, "\n".join(lines[start - 1:end])) for start, end in spans]
+
+
+# Builtins whose use lets a cell change state without naming it.
+_OPAQUE_BUILTINS = frozenset({"exec", "eval", "globals", "vars", "locals", "__import__"})
+
+
+class _CellNames(NamedTuple):
+    bound: FrozenSet[str]       # names the cell may (re)bind or delete
+    imported: FrozenSet[str]    # names bound by import statements
+    defined: FrozenSet[str]     # functions and classes it defines
+    referenced: FrozenSet[str]  # every name it mentions, def bodies included
+
+
+@lru_cache(maxsize=4096)
+def _cell_names(source: str) -> _CellNames:
+    bound, imported, defined, referenced = set(), set(), set(), set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Name):
+            referenced.add(node.id)
+            if not isinstance(node.ctx, ast.Load):
+                bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defined.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            imported.update((a.asname or a.name).split(".")[0] for a in node.names)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+    bound |= defined | imported
+    referenced |= bound
+    return _CellNames(frozenset(bound), frozenset(imported), frozenset(defined), frozenset(referenced))
+
+
+def _reusable_prefix(executed: Sequence[str], kept: int) -> int:
+    """
+    How many of the first ``kept`` executed cells can stay as they are once
+    ``executed[kept:]`` is replaced; 0 means start from a fresh interpreter.
+    """
+    cut = kept
+    while cut:
+        touched: set = set()
+        for source in executed[cut:]:
+            touched |= _cell_names(source).referenced
+        if touched & _OPAQUE_BUILTINS:
+            return 0
+        first = cut
+        for i in range(cut):
+            names = _cell_names(executed[i])
+            if touched & names.defined:
+                return 0  # calling into a kept function can touch anything
+            if touched & (names.bound - names.imported):
+                first = i
+                break
+        if first == cut:
+            return cut
+        cut = first
+    return 0
+
+
+def _memory_limiter(limit_mb: int):
+    """Return a preexec_fn capping the child's address space, where supported."""
+    try:
+        import resource
+    except ImportError:  # Windows — no rlimits
+        return None
+
+    def _apply() -> None:
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    return _apply
+
+
+class ReplSession:
+    """One sandboxed interpreter process plus the cells it has executed."""
+
+    def __init__(self, memory_mb: int) -> None:
+        self._memory_mb = memory_mb
+        self._workdir = tempfile.TemporaryDirectory(prefix="voiceforge_session_")
+        # Cells whose effects are in the namespace, in order; the first
+        # ``completed`` of them finished normally and have their output kept.
+        self.executed: List[str] = []
+        self.completed = 0
+        self.outputs: List[Tuple[str, str]] = []
+        self.last_cells: Optional[List[str]] = None
+        self.last_result: Optional[RunResult] = None
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.closed = False
+        self._spawn()
+
+    def _spawn(self) -> None:
+        self._proc = subprocess.Popen(
+            [sys.executable, "-u", _WORKER_PATH],
+            cwd=self._workdir.name,
+            env=_safe_env(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            preexec_fn=_memory_limiter(self._memory_mb),
+        )
+        self._responses: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc, self._responses), daemon=True).start()
+        self.executed = []
+        self.completed = 0
+        self.outputs = []
+        self.last_cells = None
+        self.last_result = None
+
+    @staticmethod
+    def _pump(proc: subprocess.Popen, responses: "queue.Queue[Optional[str]]") -> None:
+        for line in proc.stdout:
+            responses.put(line)
+        responses.put(None)  # EOF — the worker died
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def execute(
+        self, cells: List[Tuple[int, str]], timeout_seconds: int, forget: Sequence[str] = ()
+    ) -> Optional[dict]:
+        """Run cells in the worker; None means the worker timed out or died."""
+        self.last_used = time.monotonic()
+        request = {
+            "op": "exec",
+            "forget": sorted(forget),
+            "cells": [{"line": line, "source": src} for line, src in cells],
+        }
+        try:
+            self._proc.stdin.write(json.dumps(request) + "\n")
+            self._proc.stdin.flush()
+            line = self._responses.get(timeout=timeout_seconds)
+        except (BrokenPipeError, OSError, queue.Empty):
+            return None
+        if line is None:
+            return None
+        return json.loads(line)
+
+    def _kill(self) -> None:
+        if self.alive:
+            self._proc.kill()
+            try:
+                self._proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def restart(self) -> None:
+        """Replace the interpreter with a fresh one, dropping all state."""
+        self._kill()
+        self._spawn()
+
+    def close(self) -> None:
+        self.closed = True
+        self._kill()
+        self._workdir.cleanup()
+
+
+class SessionManager:
+    """LRU registry of ReplSessions keyed by (user_id, project_id)."""
+
+    def __init__(
+        self,
+        max_sessions: int,
+        idle_timeout_seconds: int,
+        memory_mb: int,
+    ) -> None:
+        self._sessions: "OrderedDict[SessionKey, ReplSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout_seconds
+        self._memory_mb = memory_mb
+        threading.Thread(target=self._reap_forever, daemon=True).start()
+
+    # ── Registry ──────────────────────────────────────────────────────────────
+
+    def _acquire(self, key: SessionKey) -> ReplSession:
+        evicted: List[ReplSession] = []
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = ReplSession(self._memory_mb)
+                self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self._max_sessions:
+                old_key, old = self._sessions.popitem(last=False)
+                logger.info("Evicting run session %s (LRU)", old_key)
+                evicted.append(old)
+        for old in evicted:
+            old.close()
+        return session
+
+    def _discard(self, key: SessionKey, session: ReplSession) -> None:
+        with self._lock:
+            if self._sessions.get(key) is session:
+                del self._sessions[key]
+        session.close()
+
+    def reset(self, user_id: str, project_id: str) -> bool:
+        """Kill the session for this project; the next run starts fresh."""
+        with self._lock:
+            session = self._sessions.pop((user_id, project_id), None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def reap_idle(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                key for key, session in self._sessions.items()
+                if now - session.last_used > self._idle_timeout
+            ]
+            sessions = [self._sessions.pop(key) for key in stale]
+        for session in sessions:
+            session.close()
+        if sessions:
+            logger.info("Reaped %d idle run session(s)", len(sessions))
+        return len(sessions)
+
+    def _reap_forever(self) -> None:
+        interval = max(5, self._idle_timeout // 4)
+        while True:
+            time.sleep(interval)
+            try:
+                self.reap_idle()
+            except Exception as exc:  # pragma: no cover - keep the reaper alive
+                logger.warning("Run session reaper failed: %s", exc)
+
+    # ── Execution ─────────────────────────────────────────────────────────────
+
+    def run(self, user_id: str, project_id: str, code: str, timeout_seconds: int = 5) -> RunResult:
+        rejected = _precheck(code)
+        if rejected is not None:
+            return rejected
+        cells = split_cells(code)
+        key = (user_id, project_id)
+
+        while True:
+            session = self._acquire(key)
+            with session.lock:
+                if session.closed:
+                    continue  # reset or evicted while we waited; take a fresh one
+                if not session.alive:
+                    session.restart()
+
+                sources = [src for _, src in cells]
+                if sources == session.last_cells and session.last_result is not None:
+                    # Unchanged script: re-running would repeat its side effects.
+                    return session.last_result
+
+                start = 0
+                while (
+                    start < min(session.completed, len(sources))
+                    and session.executed[start] == sources[start]
+                ):
+                    start += 1
+                start = _reusable_prefix(session.executed, start)
+                forget: set = set()
+                if start == 0 and session.executed:
+                    session.restart()
+                else:
+                    for source in session.executed[start:]:
+                        forget |= _cell_names(source).bound
+                    for source in sources[:start]:
+                        forget -= _cell_names(source).bound
+
+                response = session.execute(cells[start:], timeout_seconds, forget)
+                if response is None:
+                    timed_out = session.alive
+                    self._discard(key, session)
+                    return RunResult(
+                        stdout="",
+                        stderr="Execution timed out." if timed_out else "Session process exited unexpectedly.",
+                        exit_code=124 if timed_out else 1,
+                        timed_out=timed_out,
+                    )
+                replayed = session.outputs[:start]
+                ran = [tuple(output) for output in response["cells"]]
+                session.executed = sources[:start + len(ran)]
+                session.completed = start + response["ok_cells"]
+                session.outputs = replayed + ran[:response["ok_cells"]]
+                result = RunResult(
+                    stdout="".join(out for out, _ in replayed) + response["stdout"],
+                    stderr="".join(err for _, err in replayed) + response["stderr"],
+                    exit_code=response["exit_code"],
+                    timed_out=False,
+                )
+                session.last_cells, session.last_result = sources, result
+                return result
+
+
+_manager: Optional[SessionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> SessionManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionManager(
+                max_sessions=_env_int("RUN_SESSION_MAX", 32),
+                idle_timeout_seconds=_env_int("RUN_SESSION_IDLE_SECONDS", 600),
+                memory_mb=_env_int("RUN_SESSION_MEMORY_MB", 512),
+            )
+        return _manager
@@ -0,0 +1,109 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from backend.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+DIM = 4
+
+
+def _rows(count, seed=0):
+    return np.random.default_rng(seed).random((count, DIM), dtype=np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(tmp_path, max_bytes=1 << 20)
+
+
+def test_get_returns_what_was_put(cache):
+    vectors = _rows(2)
+    cache.put_many("m", ["a", "b"], vectors)
+    a, b, missing = cache.get_many("m", ["a", "b", "c"])
+    np.testing.assert_array_equal(a, vectors[0])
+    np.testing.assert_array_equal(b, vectors[1])
+    assert missing is None
+
+
+def test_models_do_not_share_entries(cache):
+    cache.put_many("m", ["a"], _rows(1))
+    assert cache.get_many("other", ["a"]) == [None]
+
+
+def test_least_recently_used_row_is_evicted(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_bytes=10 * DIM * 4)  # room for 10 rows
+    texts = [str(i) for i in range(10)]
+    cache.put_many("m", texts, _rows(10))
+    cache.get_many("m", ["0"])  # touch "0" so it is the most recently used
+    cache.put_many("m", ["new"], _rows(1, seed=1))
+
+    found = cache.get_many("m", texts + ["new"])
+    assert found[0] is not None and found[-1] is not None
+    assert sum(row is None for row in found) == 1
+
+
+def test_row_overwritten_by_another_process_is_a_miss(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_bytes=1 << 20)
+    cache.put_many("m", ["a", "b"], _rows(2))
+    # A second handle stands in for the other process rewriting a slot
+    # without (yet) committing the index change.
+    other = EmbeddingCache(tmp_path, max_bytes=1 << 20)
+    slot = other._db.execute("SELECT slot FROM entries WHERE model = 'm'").fetchone()[0]
+    matrix = other._matrix("m", *other._array_info("m"))
+    matrix[slot] = 9.0
+    matrix.flush()
+
+    results = cache.get_many("m", ["a", "b"])
+    assert sum(row is None for row in results) == 1
+    # The stale entry is dropped, so the text can be cached again.
+    text = "a" if results[0] is None else "b"
+    fresh = _rows(1, seed=2)
+    cache.put_many("m", [text], fresh)
+    np.testing.assert_array_equal(cache.get_many("m", [text])[0], fresh[0])
+
+
+def test_index_without_checksums_is_rebuilt(tmp_path):
+    db = sqlite3.connect(tmp_path / "index.sqlite")
+    db.executescript(
+        "CREATE TABLE entries (model TEXT, digest BLOB, slot INTEGER, last_used REAL,"
+        " PRIMARY KEY (model, digest));"
+        "INSERT INTO entries VALUES ('m', x'00', 0, 0);"
+    )
+    db.commit()
+    db.close()
+
+    cache = EmbeddingCache(tmp_path, max_bytes=1 << 20)
+    assert cache._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+    cache.put_many("m", ["a"], _rows(1))
+    assert cache.get_many("m", ["a"])[0] is not None
+
+
+class _CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text))] * DIM for text in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text))] * DIM
+
+
+def test_cached_embeddings_only_embed_misses(cache):
+    inner = _CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, "m", cache)
+    embeddings.embed_documents(["one", "three"])
+    assert embeddings.embed_documents(["three", "sixteen"]) == [[5.0] * DIM, [7.0] * DIM]
+    assert inner.calls == [["one", "three"], ["sixteen"]]
+
+
+def test_namespaces_are_cached_apart(cache):
+    inner = _CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, "m", cache)
+    embeddings.embed_documents(["text"])
+    embeddings.for_namespace("sentence").embed_documents(["text"])
+    embeddings.embed_query("text")
+    assert inner.calls == [["text"], ["text"], ["text"]]
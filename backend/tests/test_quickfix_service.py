@@ -0,0 +1,58 @@
+from backend.services.execution_service import run_python
+from backend.services.quickfix_service import _fix_indentation, try_quick_fix
+
+
+def _quick_fix(code):
+    return try_quick_fix(code, run_python(code).stderr)
+
+
+def test_adds_missing_stdlib_import():
+    fix = _quick_fix("print(math.sqrt(16))\n")
+    assert fix is not None
+    assert fix.fixed_code.startswith("import math\n")
+    assert run_python(fix.fixed_code).stdout == "4.0\n"
+
+
+def test_renames_misspelled_name():
+    fix = _quick_fix("total = 3\nprint(totl)\n")
+    assert fix is not None
+    assert "print(total)" in fix.fixed_code
+
+
+def test_closes_unclosed_bracket():
+    fix = _quick_fix("print((1 + 2)\n")
+    assert fix is not None
+    assert run_python(fix.fixed_code).stdout == "3\n"
+
+
+def test_fixes_unexpected_indent():
+    fix = _quick_fix("x = 1\n    print(x)\n")
+    assert fix is not None
+    assert fix.fixed_code == "x = 1\nprint(x)\n"
+
+
+def test_leaves_indent_after_return_to_the_llm():
+    # The stray line could belong to f or to the module; a clean run cannot tell.
+    code = "def f(x):\n    return x\n        print(x)\nprint(f(1))\n"
+    assert _quick_fix(code) is None
+
+
+def test_tab_expansion_only_touches_indentation():
+    code = 'def f():\n\tif True:\n\t\treturn "a\\tb"\n        pass\ns = """x\n\tkept"""\n'
+    fixed, _ = _fix_indentation(code, "")
+    assert fixed.splitlines() == [
+        "def f():",
+        "    if True:",
+        '        return "a\\tb"',
+        "        pass",
+        's = """x',
+        '\tkept"""',
+    ]
+
+
+def test_unfixable_error_returns_none():
+    assert _quick_fix("print(1 / 0)\n") is None
+
+
+def test_code_waiting_for_input_is_left_alone():
+    assert _quick_fix("name = input()\nprint(nme)\n") is None
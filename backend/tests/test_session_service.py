@@ -0,0 +1,74 @@
+import pytest
+
+from backend.services.session_service import SessionManager, split_cells
+
+
+def test_split_cells_one_cell_per_statement():
+    code = "import math\n\n@staticmethod\ndef f():\n    return 1\nx = f()\n"
+    assert split_cells(code) == [
+        (1, "import math"),
+        (3, "@staticmethod\ndef f():\n    return 1"),
+        (6, "x = f()"),
+    ]
+
+
+def test_split_cells_keeps_statements_sharing_a_line_together():
+    assert split_cells("a = [1]\na.append(2); print(a)\n") == [
+        (1, "a = [1]"),
+        (2, "a.append(2); print(a)"),
+    ]
+
+
+@pytest.fixture
+def run():
+    manager = SessionManager(max_sessions=4, idle_timeout_seconds=600, memory_mb=512)
+
+    def _run(code):
+        result = manager.run("user", "project", code)
+        last_error = result.stderr.strip().splitlines()[-1:]
+        return result.stdout, last_error, result.exit_code
+
+    yield _run
+    manager.reset("user", "project")
+
+
+def test_edited_cell_does_not_see_state_mutated_by_its_old_version(run):
+    assert run("a = [1]\na.append(2); print(a)\n") == ("[1, 2]\n", [], 0)
+    assert run("a = [1]\na.append(3); print(a)\n") == ("[1, 3]\n", [], 0)
+
+
+def test_unchanged_script_is_not_run_again(run):
+    code = "import random\nn = random.random()\nprint(n)\n"
+    first = run(code)
+    assert run(code) == first
+
+
+def test_skipped_cells_replay_their_output(run):
+    setup = "import random\nseed = random.random()\nprint('setup', seed)\n"
+    first, _, _ = run(setup + "print('a')\n")
+    second, _, _ = run(setup + "print('b')\n")
+    # The setup cells were reused, not re-executed: same random value, replayed.
+    assert second.splitlines() == [first.splitlines()[0], "b"]
+
+
+def test_rebinding_a_kept_name_reruns_from_its_binding(run):
+    assert run("t = 1\nprint('setup')\nx = 5\nprint(x)\n") == ("setup\n5\n", [], 0)
+    assert run("t = 1\nprint('setup')\nx = 5\nprint(x + 1)\n") == ("setup\n6\n", [], 0)
+
+
+def test_removed_cell_bindings_are_forgotten(run):
+    run("t = 1\nprint('setup')\nx = 5\nprint(x)\n")
+    assert run("t = 1\nprint('setup')\nprint(x)\n") == (
+        "setup\n", ["NameError: name 'x' is not defined"], 1,
+    )
+
+
+def test_calling_a_kept_function_starts_fresh(run):
+    assert run("def f():\n    L.append(1)\nL = []\nf()\nprint(L)\n") == ("[1]\n", [], 0)
+    assert run("def f():\n    L.append(1)\nL = []\nf()\nprint(L, 'b')\n") == ("[1] b\n", [], 0)
+
+
+def test_cells_after_exit_or_error_run_once_fixed(run):
+    assert run("print('a')\nraise SystemExit(0)\nprint('after')\n") == ("a\n", [], 0)
+    assert run("print('a')\n1 / 0\n") == ("a\n", ["ZeroDivisionError: division by zero"], 1)
+    assert run("print('a')\nprint('fixed')\n") == ("a\nfixed\n", [], 0)
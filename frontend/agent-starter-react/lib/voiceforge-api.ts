@@ -168,9 +168,34 @@ export interface LearnAIProcessResponse {
   learn_response?: LearnCodeResponse;
 }
 
-export interface PdfUploadResponse {
+export interface IngestJobStatus {
+  job_id: string;
+  book_id: string;
   collection_name: string;
-  chunks_indexed: number;
+  document_id?: string | null;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  pages_parsed: number;
+  chunks_embedded: number;
+  chunks_upserted: number;
+  chunks_failed: number;
+  chunks_unchanged: number;
+  chunks_deleted: number;
+  chunks_near_duplicate: number;
+  boilerplate_lines_removed: number;
+  error?: string | null;
+}
+
+export interface LearnBookDocumentRecord {
+  id: string;
+  book_id: string;
+  filename: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  job_id?: string | null;
+  pages: number;
+  chunks: number;
+  error?: string | null;
+  created_at?: string;
+  updated_at?: string;
 }
 
 export async function listLearnBooks(token: string): Promise<LearnBookRecord[]> {
@@ -208,11 +233,25 @@ export async function deleteLearnBook(id: string, token: string): Promise<void>
   await request<void>(`/learn-books/${id}`, { method: 'DELETE' }, token);
 }
 
+export async function getIngestJob(
+  bookId: string,
+  jobId: string,
+  token: string
+): Promise<IngestJobStatus> {
+  return request<IngestJobStatus>(
+    `/learn-books/${bookId}/ingest-jobs/${jobId}`,
+    { method: 'GET' },
+    token
+  );
+}
+
+/** Upload a PDF and resolve once the background ingestion job has finished. */
 export async function uploadLearnBookPdf(
   bookId: string,
   file: File,
-  token: string
-): Promise<PdfUploadResponse> {
+  token: string,
+  onProgress?: (job: IngestJobStatus) => void
+): Promise<IngestJobStatus> {
   const formData = new FormData();
   formData.append('file', file);
   const res = await fetch(`${BACKEND}/learn-books/${bookId}/upload-pdf`, {
@@ -224,7 +263,55 @@ export async function uploadLearnBookPdf(
     const text = await res.text().catch(() => 'Unknown error');
     throw new Error(`${res.status}: ${text}`);
   }
-  return res.json() as Promise<PdfUploadResponse>;
+  let job = (await res.json()) as IngestJobStatus;
+  while (job.status === 'queued' || job.status === 'running') {
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    job = await getIngestJob(bookId, job.job_id, token);
+  }
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'PDF indexing failed');
+  }
+  return job;
+}
+
+export async function listLearnBookDocuments(
+  bookId: string,
+  token: string
+): Promise<LearnBookDocumentRecord[]> {
+  return request<LearnBookDocumentRecord[]>(
+    `/learn-books/${bookId}/documents`,
+    { method: 'GET' },
+    token
+  );
+}
+
+/** Attach PDFs to a book; each is indexed in the background (poll getIngestJob with its job_id). */
+export async function uploadLearnBookDocuments(
+  bookId: string,
+  files: File[],
+  token: string
+): Promise<LearnBookDocumentRecord[]> {
+  const formData = new FormData();
+  files.forEach((file) => formData.append('files', file));
+  const res = await fetch(`${BACKEND}/learn-books/${bookId}/documents`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${token}` },
+    body: formData,
+  });
+  if (!res.ok) {
+    const text = await res.text().catch(() => 'Unknown error');
+    throw new Error(`${res.status}: ${text}`);
+  }
+  return (await res.json()) as LearnBookDocumentRecord[];
+}
+
+export async function deleteLearnBookDocument(
+  bookId: string,
+  documentId: string,
+  token: string
+): Promise<void> {
+  await request<void>(`/learn-books/${bookId}/documents/${documentId}`, { method: 'DELETE' }, token);
 }
 
 export async function fetchLearnGenerate(
@@ -238,3 +325,58 @@ export async function fetchLearnGenerate(
     token
   );
 }
+
+export interface LearnAskHandlers {
+  onSources?: (sources: string[]) => void;
+  onToken?: (text: string) => void;
+}
+
+/** Ask a question about the book's PDF; streams tokens and resolves with the full answer. */
+export async function askLearnBook(
+  bookId: string,
+  question: string,
+  token: string,
+  handlers: LearnAskHandlers = {},
+  k = 3
+): Promise<{ answer: string; sources: string[] }> {
+  const res = await fetch(`${BACKEND}/learn-books/${bookId}/ask`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      Authorization: `Bearer ${token}`,
+    },
+    body: JSON.stringify({ question, k }),
+  });
+  if (!res.ok || !res.body) {
+    const text = await res.text().catch(() => 'Unknown error');
+    throw new Error(`${res.status}: ${text}`);
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let answer = '';
+  let sources: string[] = [];
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let boundary: number;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = /^event: (.*)$/m.exec(frame)?.[1];
+      const data = JSON.parse(/^data: (.*)$/m.exec(frame)?.[1] ?? '{}');
+      if (event === 'sources') {
+        sources = data.sources;
+        handlers.onSources?.(sources);
+      } else if (event === 'token') {
+        answer += data.text;
+        handlers.onToken?.(data.text);
+      } else if (event === 'error') {
+        throw new Error(data.detail || 'Answer failed');
+      }
+    }
+  }
+  return { answer, sources };
+}